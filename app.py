@@ -5,8 +5,11 @@ Combines PDF Summarization and Doctor Recommendation System
 
 import streamlit as st
 from streamlit_option_menu import option_menu
-import pandas as pd
+import html
+import threading
 import time
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeout
 from pathlib import Path
 import sys
 
@@ -14,13 +17,20 @@ import sys
 sys.path.append(str(Path(__file__).parent))
 
 # Import modules
-from modules.disease_mapper import predict_specialist
-from modules.doctor_filtering import get_doctors_by_specialist
+from modules.recommender import recommend_doctors, recommend_for_conditions, split_conditions
+from modules.doctor_cards import build_doctor_cards_html
+from modules.autocomplete import suggest_diseases, suggest_locations
+from modules.availability import MIN_EXPERIENCE, MIN_RATING, get_matrix
+from modules.data_store import DOCTOR_BACKEND, start_watcher
+from modules.query_log import prewarm
 
 # For PDF summarization
-from transformers import BartForConditionalGeneration, BartTokenizer
-import PyPDF2
-import io
+from modules import summarizer
+from modules.admission import AdmissionRejected
+from modules.generation_control import GenerationCancelled, SessionBusy, submit as submit_generation
+from modules.extractive import extractive_summary, progressive_stats, time_to_final_summary, time_to_first_summary
+from modules.incremental_summary import read_record_pages, summarize_record
+from modules.summarizer import extract_text_from_pdf, summarize_text
 
 # ============ PAGE CONFIG ============
 st.set_page_config(
@@ -189,59 +199,54 @@ st.markdown("""
 @st.cache_resource
 def load_bart_model():
     """Load BART model for PDF summarization"""
-    model_name = "facebook/bart-large-cnn"
-    tokenizer = BartTokenizer.from_pretrained(model_name)
-    model = BartForConditionalGeneration.from_pretrained(model_name)
-    return tokenizer, model
+    return summarizer.load_bart_model()
 
 @st.cache_resource
-def load_doctor_data():
-    """Load doctor profiles CSV"""
-    try:
-        df = pd.read_csv("data/doctor_profiles.csv")
-        return df
-    except:
-        return None
+def start_model_warmup():
+    """Load and prime the model in the background (once per process)"""
+    return summarizer.start_warmup()
+
+@st.cache_resource
+def start_data_watcher():
+    """Hot-reload data/*.csv in the background (once per process)"""
+    return start_watcher()
 
-# ============ PDF FUNCTIONS ============
-def extract_text_from_pdf(uploaded_file):
-    """Extract text from PDF file"""
-    pdf_reader = PyPDF2.PdfReader(uploaded_file)
-    extracted_text = ""
-    for page in pdf_reader.pages:
-        extracted_text += page.extract_text()
-    return extracted_text
+@st.cache_resource
+def build_doctor_database():
+    """Build the SQLite directory in the background (once per process)"""
+    if DOCTOR_BACKEND == "sqlite":
+        from modules.sqlite_store import start_build
+        return start_build()
+
+@st.cache_resource
+def prewarm_caches():
+    """Replay popular logged searches into the caches in the background (once per process)"""
+    thread = threading.Thread(target=prewarm, name="docwise-prewarm", daemon=True)
+    thread.start()
+    return thread
 
-def generate_summary(text, tokenizer, model, max_length=200, min_length=50):
-    """Generate summary using BART model - optimized for speed"""
+# ============ GENERATION SESSIONS ============
+def session_id():
+    """Stable id for this browser session"""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def wait_for_generation(token, future):
+    """Wait for a background generation; cancel it if Streamlit stops this run"""
+    progress = st.empty()
     try:
-        # Truncate text for faster processing
-        inputs = tokenizer.encode(
-            "summarize: " + text,
-            max_length=1024,
-            truncation=True,
-            return_tensors="pt"
-        )
-        
-        # Generate summary with optimized parameters for speed
-        summary_ids = model.generate(
-            inputs,
-            max_length=max_length,
-            min_length=min_length,
-            num_beams=2,  # Reduced from 4 for speed
-            length_penalty=1.5,  # Reduced from 2.0
-            early_stopping=True,
-            no_repeat_ngram_size=3
-        )
-        
-        summary = tokenizer.decode(
-            summary_ids[0],
-            skip_special_tokens=True
-        )
-        
-        return summary
-    except Exception as e:
-        return f"Error generating summary: {str(e)}"
+        while True:
+            try:
+                return future.result(timeout=0.05)
+            except FutureTimeout:
+                # Each Streamlit call is where a rerun (new click, slider change,
+                # page switch) or a closed session interrupts this run
+                progress.caption(f"Decoding step {token.steps}...")
+    finally:
+        if not future.done():
+            token.cancel()
+        progress.empty()
 
 # ============ DOCTOR DASHBOARD ============
 def doctor_dashboard():
@@ -254,10 +259,24 @@ def doctor_dashboard():
     """, unsafe_allow_html=True)
     
     # Load BART model
-    with st.spinner("Loading AI model..."):
-        tokenizer, model = load_bart_model()
-    
-    st.success("✅ AI Model loaded successfully")
+    model_ready = True
+    if summarizer.WARMUP_ENABLED:
+        # Warm-up runs in the background; show where it is instead of blocking
+        state, error = summarizer.model_state()
+        model_ready = state == summarizer.MODEL_READY
+        if model_ready:
+            tokenizer, model = load_bart_model()
+            st.success("✅ AI Model loaded successfully")
+        elif state == summarizer.MODEL_FAILED:
+            st.error(f"❌ AI model failed to load: {error}")
+        else:
+            st.info(f"⏳ AI model is {state}... You can upload a report meanwhile.")
+            st.button("🔄 Check model status")
+    else:
+        with st.spinner("Loading AI model..."):
+            tokenizer, model = load_bart_model()
+        
+        st.success("✅ AI Model loaded successfully")
     
     # Main content
     col1, col2 = st.columns([1, 1])
@@ -282,6 +301,19 @@ def doctor_dashboard():
         with st.expander("⚙️ Summarization Settings"):
             max_length = st.slider("Maximum Summary Length", 50, 5000, 200, 10)
             min_length = st.slider("Minimum Summary Length", 10, 500, 50, 5)
+            record_id = st.text_input(
+                "Patient Record ID (optional)",
+                help="For records that grow over time: only new or changed pages are summarized again"
+            ).strip()
+            # Record summaries run one generation per section, which the planner can't budget
+            latency_budget = st.slider(
+                "Time Budget (seconds, 0 = no limit)", 0, 120, 0, 1,
+                disabled=bool(record_id),
+                help="Beams, input size and summary length are reduced as needed to finish in time "
+                     "(not available with a Patient Record ID)"
+            )
+            if record_id:
+                latency_budget = 0
     
     with col2:
         st.markdown("### 📊 Generated Summary")
@@ -290,35 +322,85 @@ def doctor_dashboard():
             # Show file info
             st.info(f"📎 File: {uploaded_pdf.name} ({uploaded_pdf.size / 1024:.2f} KB)")
             
-            if st.button("🚀 Generate Summary", use_container_width=True):
+            if st.button("🚀 Generate Summary", use_container_width=True, disabled=not model_ready):
                 # Start timer
                 start_time = time.time()
+                budget_start = time.perf_counter()
                 
-                with st.spinner("🔄 Extracting text from PDF..."):
+                # Shows key sentences as soon as the text is extracted, then
+                # the AI summary in the same place once it is ready
+                summary_box = st.empty()
+                timings = {}
+                
+                def show_quick_summary(text):
+                    quick = extractive_summary(text, max_words=max(30, max_length * 3 // 4))
+                    timings["first"] = time.time() - start_time
+                    time_to_first_summary.record(timings["first"])
+                    summary_box.markdown(f"""
+                    <div class="summary-box">
+                        <h4>⚡ Quick Summary (key sentences, AI summary on its way...)</h4>
+                        <p>{html.escape(quick)}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with st.spinner("🤖 Reading PDF and generating AI summary..."):
                     try:
-                        final_text = extract_text_from_pdf(uploaded_pdf)
+                        # Text and key sentences first, on this thread: they
+                        # never wait for a generation thread or for memory
+                        if record_id:
+                            pages, new_pages = read_record_pages(record_id, uploaded_pdf)
+                            final_text = "\n".join(text for _, text in pages)
+                        else:
+                            final_text = extract_text_from_pdf(uploaded_pdf)
+                        show_quick_summary(final_text)
+                        
+                        # Waits for memory held by other sessions' summaries;
+                        # supersedes this session's earlier generation
+                        if record_id:
+                            token, future = submit_generation(
+                                session_id(),
+                                summarize_record,
+                                record_id,
+                                None,
+                                tokenizer,
+                                model,
+                                max_length,
+                                min_length,
+                                pages=pages,
+                                new_pages=new_pages
+                            )
+                            result = wait_for_generation(token, future)
+                            summary = result["summary"]
+                            st.caption(
+                                f"{result['new_pages']} of {result['pages']} pages new or changed; "
+                                f"reused {result['reused_nodes']} section summaries, "
+                                f"generated {result['summarized_nodes']}"
+                            )
+                        else:
+                            # The budget counts from the click: reading the PDF and
+                            # waiting for a thread and for memory are included
+                            token, future = submit_generation(
+                                session_id(),
+                                summarize_text,
+                                final_text,
+                                tokenizer,
+                                model,
+                                max_length,
+                                min_length,
+                                latency_budget=latency_budget or None,
+                                budget_start=budget_start
+                            )
+                            summary = wait_for_generation(token, future)
                         word_count = len(final_text.split())
                         st.caption(f"Words detected: {word_count}")
-                    except Exception as e:
-                        st.error(f"❌ Error reading PDF: {str(e)}")
-                        return
-                
-                with st.spinner("🤖 Generating AI summary..."):
-                    try:
-                        summary = generate_summary(
-                            final_text,
-                            tokenizer,
-                            model,
-                            max_length,
-                            min_length
-                        )
                         
                         # End timer
                         end_time = time.time()
                         processing_time = end_time - start_time
+                        time_to_final_summary.record(processing_time)
                         
-                        # Display summary
-                        st.markdown(f"""
+                        # Display summary, replacing the quick one
+                        summary_box.markdown(f"""
                         <div class="summary-box">
                             <h4>📄 Summary</h4>
                             <p>{summary}</p>
@@ -357,6 +439,9 @@ def doctor_dashboard():
                         
                         # Processing time
                         st.success(f"⏱️ Processing completed in {processing_time:.2f} seconds")
+                        if latency_budget:
+                            st.caption(f"🎯 Time budget: {latency_budget} seconds")
+                        st.caption(f"⚡ First summary shown after {timings['first']:.2f} seconds")
                         
                         # Download button
                         st.download_button(
@@ -367,6 +452,12 @@ def doctor_dashboard():
                             use_container_width=True
                         )
                         
+                    except GenerationCancelled:
+                        st.info("ℹ️ This summary was cancelled by a newer request.")
+                    except SessionBusy:
+                        st.warning("⏳ A previous summary is still stopping, please try again in a moment.")
+                    except AdmissionRejected as e:
+                        st.warning(f"⏳ The server is too busy to summarize this report right now: {e}")
                     except Exception as e:
                         st.error(f"❌ Error generating summary: {str(e)}")
         else:
@@ -377,8 +468,72 @@ def doctor_dashboard():
                 </p>
             </div>
             """, unsafe_allow_html=True)
+    
+    # Progressive summaries across all sessions of this server process
+    with st.expander("⏱️ Summary Timing (this server)"):
+        timing = progressive_stats()
+        first, final = timing["time_to_first_summary"], timing["time_to_final_summary"]
+        col_a, col_b, col_c = st.columns(3)
+        col_a.metric("Summaries", final["count"])
+        col_b.metric("First Summary p50 / p95", f"{first['p50']:.2f}s / {first['p95']:.2f}s")
+        col_c.metric("AI Summary p50 / p95", f"{final['p50']:.2f}s / {final['p95']:.2f}s")
 
 # ============ PATIENT DASHBOARD ============
+def _use_suggestion(key, value):
+    st.session_state[key] = value
+
+def show_suggestions(value, key, suggest, limit=4):
+    """Clickable suggestions under a text input, unless it already holds a known name"""
+    if not value or not value.strip():
+        return
+    suggestions = suggest(value, limit)
+    if not suggestions or any(s.lower() == value.strip().lower() for s in suggestions):
+        return
+    st.caption("Did you mean:")
+    cols = st.columns(len(suggestions))
+    for i, suggestion in enumerate(suggestions):
+        cols[i].button(
+            suggestion,
+            key=f"{key}_suggestion_{i}",
+            on_click=_use_suggestion,
+            args=(key, suggestion)
+        )
+
+def show_multi_condition_results(conditions, location):
+    """Search results for several conditions at once"""
+    with st.spinner("🔍 Finding the best doctors for you..."):
+        try:
+            result = recommend_for_conditions(
+                conditions,
+                location=location if location else None,
+                min_experience=2,
+                min_rating=3.5
+            )
+        except Exception as e:
+            st.error(f"❌ Error fetching doctors: {str(e)}")
+            return
+    
+    if result["unknown"]:
+        st.warning(f"⚠️ Not found in our database: {', '.join(result['unknown'])}")
+    
+    if not result["specialists"]:
+        st.error("❌ None of these conditions were found in our database. Please try different search terms.")
+        return
+    
+    st.success(
+        f"✅ {len(result['doctors'])} doctors across "
+        f"{len(result['specialists'])} recommended specialties"
+    )
+    
+    for specialist, covered in result["specialists"].items():
+        doctors_df = result["sections"][specialist]
+        st.markdown(f"### 👨‍⚕️ {specialist} — for {', '.join(covered)}")
+        
+        if doctors_df.empty:
+            st.warning("⚠️ No suitable doctors found in your area for this specialty.")
+        else:
+            st.markdown(build_doctor_cards_html(doctors_df), unsafe_allow_html=True)
+
 def patient_dashboard():
     """Patient Dashboard - Doctor Recommendation"""
     st.markdown("""
@@ -398,14 +553,18 @@ def patient_dashboard():
         disease = st.text_input(
             "🏥 Enter your symptoms or disease",
             placeholder="e.g., diabetes, headache, fever",
-            help="Enter the condition or symptoms you're experiencing"
+            help="Enter the condition or symptoms you're experiencing",
+            key="disease_input"
         )
+        show_suggestions(disease, "disease_input", suggest_diseases)
         
         location = st.text_input(
             "📍 Enter your location",
             placeholder="e.g., Chennai, Mumbai, Delhi",
-            help="Enter your preferred location for doctor search"
+            help="Enter your preferred location for doctor search",
+            key="location_input"
         )
+        show_suggestions(location, "location_input", suggest_locations)
         
         search_clicked = st.button("🔎 Find Doctors", use_container_width=True)
     
@@ -426,63 +585,35 @@ def patient_dashboard():
         st.markdown("---")
         st.markdown("### 🩺 Search Results")
         
+        # Several conditions are resolved together, one section per specialist
+        conditions = split_conditions(disease)
+        if len(conditions) > 1:
+            show_multi_condition_results(conditions, location)
+            return
+        
         with st.spinner("🔍 Finding the best doctors for you..."):
-            # Predict specialist
-            specialist = predict_specialist(disease)
+            # Predict specialist and get doctors (cached per query)
+            try:
+                specialist, doctors_df = recommend_doctors(
+                    disease,
+                    location=location if location else None,
+                    min_experience=2,
+                    min_rating=3.5
+                )
+            except Exception as e:
+                st.error(f"❌ Error fetching doctors: {str(e)}")
+                return
             
             if specialist:
                 st.success(f"✅ Recommended Specialist: **{specialist}**")
                 
-                # Get doctors
                 try:
-                    doctors_df = get_doctors_by_specialist(
-                        specialist, 
-                        location=location if location else None,
-                        min_experience=2,
-                        min_rating=3.5
-                    )
-                    
                     if not doctors_df.empty:
-                        # Sort by rating
-                        doctors_df = doctors_df.sort_values(by="Rating", ascending=False)
-                        
+                        # Already ordered by the composite ranking score
                         st.markdown(f"### 👨‍⚕️ Top {len(doctors_df)} Doctors Found")
                         
-                        # Display doctor cards
-                        for idx, (_, doctor) in enumerate(doctors_df.iterrows(), 1):
-                            st.markdown(f"""
-                            <div class="doctor-card">
-                                <div style="display: flex; justify-content: space-between; align-items: center;">
-                                    <div>
-                                        <h3 style="margin: 0; color: #1193d4;">#{idx} {doctor['Name']}</h3>
-                                        <p style="margin: 5px 0; color: #666;">
-                                            👨‍⚕️ {doctor['Specialist']} | 
-                                            💼 {doctor['Experience']} years experience | 
-                                            ⭐ {doctor['Rating']}/5.0
-                                        </p>
-                                        <p style="margin: 5px 0; color: #666;">
-                                            🏢 {doctor['Location']} | 
-                                            📞 {doctor['Contact']}
-                                        </p>
-                                    </div>
-                                    <div style="text-align: center; padding: 1rem;">
-                                        <div style="background: linear-gradient(135deg, #1193d4 0%, #0e7ab8 100%); 
-                                                    color: white; 
-                                                    border-radius: 50%; 
-                                                    width: 60px; 
-                                                    height: 60px; 
-                                                    display: flex; 
-                                                    align-items: center; 
-                                                    justify-content: center;
-                                                    font-size: 1.5rem;
-                                                    font-weight: bold;">
-                                            {doctor['Rating']}
-                                        </div>
-                                        <p style="margin: 5px 0; font-size: 0.8rem;">Rating</p>
-                                    </div>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
+                        # Display all doctor cards as a single element
+                        st.markdown(build_doctor_cards_html(doctors_df), unsafe_allow_html=True)
                         
                     else:
                         st.warning("⚠️ No suitable doctors found in your area. Try expanding your search location.")
@@ -495,10 +626,44 @@ def patient_dashboard():
     elif search_clicked and not disease:
         st.warning("⚠️ Please enter a disease or symptom to search for doctors.")
 
+# ============ AVAILABILITY DASHBOARD ============
+def availability_dashboard():
+    """Operations view - qualified doctors per specialist and city"""
+    st.markdown("""
+    <div class="docwise-header">
+        <h1 class="docwise-title">📊 Availability</h1>
+        <p class="docwise-subtitle">Qualified Doctors by Specialist and City</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Materialized per data snapshot; this only reads it
+    matrix = get_matrix()
+    frame = matrix.frame()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Qualified Doctors", f"{int(frame['Total'].sum()):,}")
+    col2.metric("Specialists", len(frame.index))
+    col3.metric("Cities", len(frame.columns) - 1)
+    col4.metric("Uncovered Pairs", f"{int((frame.drop(columns='Total') == 0).to_numpy().sum()):,}")
+    
+    st.caption(
+        f"At least {MIN_EXPERIENCE} years of experience and a rating of {MIN_RATING} or more "
+        f"(data version {matrix.version})."
+    )
+    st.dataframe(frame, use_container_width=True)
+
 # ============ MAIN APP ============
 def main():
     """Main application - no authentication required"""
     
+    # Pick up roster changes without restarting the worker
+    start_data_watcher()
+    build_doctor_database()
+    prewarm_caches()
+    
+    if summarizer.WARMUP_ENABLED:
+        start_model_warmup()
+    
     # Sidebar navigation
     with st.sidebar:
         st.markdown("""
@@ -513,8 +678,8 @@ def main():
         # Navigation menu
         selected = option_menu(
             menu_title="Dashboard",
-            options=["👨‍⚕️ Doctor", "🧑‍🤝‍🧑 Patient"],
-            icons=["hospital", "people"],
+            options=["👨‍⚕️ Doctor", "🧑‍🤝‍🧑 Patient", "📊 Availability"],
+            icons=["hospital", "people", "bar-chart"],
             default_index=0,
             orientation="vertical",
             styles={
@@ -537,6 +702,8 @@ def main():
     # Route to selected dashboard
     if selected == "👨‍⚕️ Doctor":
         doctor_dashboard()
+    elif selected == "📊 Availability":
+        availability_dashboard()
     else:
         patient_dashboard()
 
@@ -0,0 +1,79 @@
+"""
+Per-keystroke autocomplete latency under concurrent sessions.
+
+Every session "types" random disease and city names one character at a
+time and asks for suggestions after each keystroke, with a share of
+misspelt input to exercise the typo fallback.
+
+Usage: python benchmarks/autocomplete_bench.py [--sessions 1,8,32] [--duration 5]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.autocomplete import suggest_diseases, suggest_locations
+from modules.data_store import get_snapshot
+from modules.metrics import LatencyStats
+
+
+def typo(word, rng):
+    if len(word) < 4:
+        return word
+    i = rng.integers(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def session(seed, deadline, diseases, cities, stats):
+    rng = np.random.default_rng(seed)
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.5:
+            word, suggest = diseases[rng.integers(len(diseases))], suggest_diseases
+        else:
+            word, suggest = cities[rng.integers(len(cities))], suggest_locations
+        if rng.random() < 0.2:
+            word = typo(word, rng)
+        for end in range(1, len(word) + 1):
+            start = time.perf_counter()
+            suggest(word[:end])
+            stats.record(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    snapshot = get_snapshot()
+    diseases = list(snapshot.disease_names.values())
+    cities = list(snapshot.doctor_df["Location"].astype(str).unique())
+    suggest_diseases("warm")
+
+    print(f"{'sessions':>8} {'lookups/s':>11} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8}")
+    for sessions in (int(s) for s in args.sessions.split(",")):
+        stats = LatencyStats(window=2_000_000)
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=session, args=(i, deadline, diseases, cities, stats))
+            for i in range(sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        s = stats.summary()
+        print(f"{sessions:>8} {s['count'] / elapsed:>11,.0f} "
+              f"{s['p50'] * 1e6:>8.1f} {s['p95'] * 1e6:>8.1f} {s['p99'] * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare load time and resident memory of doctor_profiles as CSV vs the
+memory-mapped columnar format, at several directory sizes.
+
+Synthetic directories are made by resampling data/doctor_profiles.csv,
+so specialty and city proportions match the real data. Each load runs in
+a fresh interpreter so RSS numbers are not polluted by earlier runs.
+
+Usage: python benchmarks/columnar_storage.py [rows ...]
+       (default: 1000 1000000 10000000)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from modules import columnar_store
+
+
+def _rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(fmt, path):
+    """Runs in the child process: load once and print seconds and RSS delta."""
+    rss_before = _rss_kb()
+    start = time.perf_counter()
+    if fmt == "csv":
+        df = pd.read_csv(path)
+    else:
+        df = columnar_store.load_columnar(path)
+    # Touch every row of a filter column, as a query would
+    int((df["Experience"] >= 2).sum())
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed} {_rss_kb() - rss_before}")
+
+
+def make_directory(rows, out_dir):
+    base = pd.read_csv(ROOT / "data" / "doctor_profiles.csv")
+    rng = np.random.default_rng(0)
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    # Keep Contact and Name unique like the real directory, so the
+    # columnar Name costs what it would with real names
+    df["Contact"] = 6000000000 + np.arange(rows)
+    df["Name"] = df["Name"] + " " + pd.Series(np.arange(rows)).astype(str)
+
+    csv_path = os.path.join(out_dir, f"doctors_{rows}.csv")
+    df.to_csv(csv_path, index=False)
+    columnar_dir = os.path.join(out_dir, f"doctors_{rows}.columns")
+    columnar_store.build_from_csv(csv_path, columnar_dir)
+    return csv_path, columnar_dir
+
+
+def run_child(fmt, path):
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", fmt, path],
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    return float(output[0]), int(output[1])
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'format':>9} {'load ms':>10} {'RSS MB':>9} {'disk MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            csv_path, columnar_dir = make_directory(rows, tmp)
+            disk = {
+                "csv": os.path.getsize(csv_path),
+                "columnar": sum(p.stat().st_size for p in Path(columnar_dir).iterdir()),
+            }
+            for fmt, path in (("csv", csv_path), ("columnar", columnar_dir)):
+                seconds, rss_kb = run_child(fmt, path)
+                print(f"{rows:>10} {fmt:>9} {seconds * 1000:>10.1f} "
+                      f"{rss_kb / 1024:>9.1f} {disk[fmt] / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        main([int(n) for n in sys.argv[1:]] or [1000, 1000000, 10000000])
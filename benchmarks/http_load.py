@@ -0,0 +1,79 @@
+"""
+Keep-alive load generator for modules/http_service.py.
+
+Opens N persistent connections and fires requests back to back for a
+fixed duration, then reports requests/second and latency percentiles.
+
+Usage: python benchmarks/http_load.py [--url http://127.0.0.1:8080] [-c 64] [-d 10]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from urllib.parse import quote, urlsplit
+
+QUERIES = [
+    ("diabetes", "Chennai"), ("fever", "Mumbai"), ("asthma", "Madurai"),
+    ("migraine", "Coimbatore"), ("acne", ""), ("flu", "Salem"), ("anemia", "Chennai"),
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def client(host, port, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            disease, location = random.choice(QUERIES)
+            path = f"/doctors?disease={quote(disease)}&location={quote(location)}&min_experience=2&min_rating=3.5"
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors.append(head.split(b"\r\n", 1)[0])
+    finally:
+        writer.close()
+
+
+async def run(url, connections, duration):
+    parts = urlsplit(url)
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(parts.hostname, parts.port or 80, deadline, latencies, errors)
+        for _ in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {connections} connections in {elapsed:.1f}s: "
+          f"{len(latencies) / elapsed:,.0f} req/s, {len(errors)} non-200")
+    print("latency ms: " + ", ".join(
+        f"p{p}={percentile(latencies, p) * 1000:.2f}" for p in (50, 95, 99)
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("-c", "--connections", type=int, default=64)
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.connections, args.duration))
+
+
+if __name__ == "__main__":
+    main()
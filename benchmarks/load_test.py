@@ -0,0 +1,130 @@
+"""
+Concurrent-session load test for doctor search (and optionally the summarizer).
+
+For every directory size, a synthetic directory is generated and swapped
+in as the live data snapshot. Then N simulated patient sessions run
+concurrently as threads, the same way Streamlit runs sessions. Each
+session picks a condition and a city with realistic skew and calls
+predict_specialist + get_doctors_by_specialist. Throughput and
+p50/p95/p99 latency are reported per (size, sessions).
+
+Usage:
+    python benchmarks/load_test.py --sizes 1000,100000,1000000 --sessions 1,8,32 --duration 10
+    python benchmarks/load_test.py --cached            # go through the result cache
+    python benchmarks/load_test.py --summary-ratio 0.02  # 2% of actions summarize a report
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.data_store import get_snapshot, make_snapshot, repository
+from modules.disease_mapper import predict_specialist
+from modules.doctor_filtering import get_doctors_by_specialist
+from modules.metrics import LatencyStats
+from modules.query_log import disable as disable_query_log
+from modules.recommender import recommend_doctors
+from modules.synthetic_directory import zipf_weights, generate_directory
+
+REPORT_TEXT = (
+    "Patient presented with elevated fasting glucose and fatigue. History of hypertension. "
+    "HbA1c measured at 8.1 percent. Started on metformin and advised dietary changes. "
+    "Follow-up in three months with repeat lipid profile and kidney function tests. "
+) * 20
+
+
+def run_session(session_id, deadline, conditions, condition_p, cities, city_p,
+                cached, summary_ratio, search_stats, summary_stats, model):
+    rng = np.random.default_rng(session_id)
+    while time.perf_counter() < deadline:
+        if summary_ratio and rng.random() < summary_ratio:
+            from modules.summarizer import generate_summary
+            start = time.perf_counter()
+            generate_summary(REPORT_TEXT, *model)
+            summary_stats.record(time.perf_counter() - start)
+            continue
+
+        disease = conditions[rng.choice(len(conditions), p=condition_p)]
+        # One search in five leaves the location empty
+        location = None if rng.random() < 0.2 else cities[rng.choice(len(cities), p=city_p)]
+
+        start = time.perf_counter()
+        if cached:
+            recommend_doctors(disease, location, min_experience=2, min_rating=3.5)
+        else:
+            specialist = predict_specialist(disease)
+            if specialist:
+                get_doctors_by_specialist(specialist, location, min_experience=2, min_rating=3.5)
+        search_stats.record(time.perf_counter() - start)
+
+
+def run_level(sessions, duration, cached, summary_ratio, model):
+    snapshot = get_snapshot()
+    conditions = snapshot.disease_df["Disease"].to_numpy()
+    cities = np.array(list(snapshot.location_code_by_key))
+    # Popular conditions and big cities dominate, as in real traffic
+    condition_p = zipf_weights(len(conditions), 1.0)
+    city_p = zipf_weights(len(cities), 1.1)
+
+    search_stats, summary_stats = LatencyStats(window=1_000_000), LatencyStats()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=run_session, args=(
+            i, deadline, conditions, condition_p, cities, city_p,
+            cached, summary_ratio, search_stats, summary_stats, model,
+        ))
+        for i in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return search_stats, summary_stats, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--sessions", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--cached", action="store_true", help="use recommend_doctors (result cache)")
+    parser.add_argument("--summary-ratio", type=float, default=0.0,
+                        help="fraction of session actions that summarize a report")
+    args = parser.parse_args()
+    disable_query_log()
+
+    model = None
+    if args.summary_ratio:
+        from modules.summarizer import load_bart_model
+        model = load_bart_model()
+
+    print(f"{'doctors':>10} {'sessions':>8} {'searches/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          + ("  summaries  sum p50 s  sum p99 s" if args.summary_ratio else ""))
+    for size in (int(s) for s in args.sizes.split(",")):
+        snapshot = make_snapshot(
+            generate_directory(size), get_snapshot().disease_df.copy(), get_snapshot().version + 1
+        )
+        repository.replace_snapshot(snapshot)
+
+        for sessions in (int(s) for s in args.sessions.split(",")):
+            search, summary, elapsed = run_level(
+                sessions, args.duration, args.cached, args.summary_ratio, model
+            )
+            s = search.summary()
+            line = (f"{size:>10} {sessions:>8} {s['count'] / elapsed:>11,.0f} "
+                    f"{s['p50'] * 1000:>8.2f} {s['p95'] * 1000:>8.2f} {s['p99'] * 1000:>8.2f}")
+            if args.summary_ratio:
+                m = summary.summary()
+                line += f"  {m['count']:>9} {m['p50']:>9.2f} {m['p99']:>9.2f}"
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
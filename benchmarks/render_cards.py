@@ -0,0 +1,37 @@
+"""
+Time building the doctor result cards for a large result set.
+
+Usage: python benchmarks/render_cards.py [rows] [repeats]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules import doctor_cards
+from modules.doctor_cards import build_doctor_cards_html
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    base = pd.read_csv(Path(__file__).parent.parent / "data" / "doctor_profiles.csv")
+    doctors_df = base.sample(n=rows, replace=rows > len(base), random_state=0)
+
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            if label == "cold":
+                doctor_cards._card_cache.clear()
+            page_html = build_doctor_cards_html(doctors_df)
+        elapsed = (time.perf_counter() - start) / repeats
+        print(f"{label}: {rows} cards in {elapsed * 1000:.2f} ms ({len(page_html) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
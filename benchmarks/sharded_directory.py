@@ -0,0 +1,102 @@
+"""
+Throughput of the sharded doctor directory against the single-process one.
+
+A synthetic directory of each size goes live, then concurrent client
+threads issue top-k queries (with and without a city, Zipf-skewed like
+real traffic). They run against the in-memory backend and against
+ShardedDirectory for each shard count. Reports queries/s, p50/p99
+latency, mean fan-out and the slowest shard's p99.
+
+Usage:
+    python benchmarks/sharded_directory.py --sizes 1000000,10000000 --shards 1,4,8 --clients 16
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.data_store import get_snapshot, make_snapshot, repository
+from modules.doctor_filtering import filter_snapshot
+from modules.metrics import LatencyStats
+from modules.query_log import disable as disable_query_log
+from modules.sharded_directory import ShardedDirectory
+from modules.synthetic_directory import generate_directory, zipf_weights
+
+TOP_K = 20
+
+
+def run(query, clients, duration, specialists, cities):
+    stats = LatencyStats(window=1_000_000)
+    deadline = time.perf_counter() + duration
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        specialist_p = zipf_weights(len(specialists), 0.8)
+        city_p = zipf_weights(len(cities), 1.1)
+        while time.perf_counter() < deadline:
+            specialist = specialists[rng.choice(len(specialists), p=specialist_p)]
+            # One search in five leaves the location empty (scattered to all shards)
+            location = None if rng.random() < 0.2 else cities[rng.choice(len(cities), p=city_p)]
+            start = time.perf_counter()
+            query(specialist, location)
+            stats.record(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.summary(), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000000")
+    parser.add_argument("--shards", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--by", default="location", choices=["location", "specialist"])
+    args = parser.parse_args()
+    disable_query_log()
+
+    print(f"{'doctors':>10} {'backend':<12} {'queries/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'fan-out':>7} {'shard p99 ms':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        snapshot = make_snapshot(generate_directory(size), get_snapshot().disease_df.copy(),
+                                 get_snapshot().version + 1)
+        repository.replace_snapshot(snapshot)
+        specialists = list(snapshot.specialist_rows)
+        cities = list(snapshot.location_code_by_key)
+
+        def in_memory(specialist, location):
+            return filter_snapshot(snapshot, specialist, location, 2, 3.5, ranked=True).head(TOP_K)
+
+        s, elapsed = run(in_memory, args.clients, args.duration, specialists, cities)
+        print(f"{size:>10} {'memory':<12} {s['count'] / elapsed:>10,.0f} "
+              f"{s['p50'] * 1000:>8.2f} {s['p99'] * 1000:>8.2f} {'':>7} {'':>12}", flush=True)
+
+        for shards in (int(n) for n in args.shards.split(",")):
+            directory = ShardedDirectory(shards=shards, by=args.by)
+            try:
+                s, elapsed = run(
+                    lambda specialist, location: directory.query(specialist, location, 2, 3.5, True, TOP_K),
+                    args.clients, args.duration, specialists, cities,
+                )
+                stats = directory.stats()
+                slowest = max(shard["round_trip_seconds"]["p99"] for shard in stats["per_shard"])
+                print(f"{size:>10} {f'{shards} shards':<12} {s['count'] / elapsed:>10,.0f} "
+                      f"{s['p50'] * 1000:>8.2f} {s['p99'] * 1000:>8.2f} "
+                      f"{stats['mean_fanout']:>7.2f} {slowest * 1000:>12.2f}", flush=True)
+            finally:
+                directory.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Quality-versus-latency sweep over summarizer configurations.
+
+Every combination of beams, length penalty, output length, input
+strategy and inference backend is run over the fixture reports in
+benchmarks/fixtures/report_summaries.jsonl. For each combination the
+sweep records ROUGE-1/2/L F1 against the reference summaries, latency
+(p50/p95 per report) and process memory. The Pareto frontier (no other
+configuration is both faster and better on ROUGE-L) is printed at the
+end, so defaults in modules/summarizer.py can be picked on evidence.
+
+Backends:
+    fp32   the model as the app loads it (shared mmap weights if exported)
+    int8   dynamic int8 quantization of the Linear layers
+    bf16   a bfloat16 copy of the weights
+
+Usage:
+    python benchmarks/summarizer_sweep.py
+    python benchmarks/summarizer_sweep.py --beams 1,2,4 --backends fp32,int8 --out sweep.csv
+    python benchmarks/summarizer_sweep.py --boilerplate 12   # reports longer than the input window
+"""
+
+import argparse
+import csv
+import json
+import re
+import resource
+import sys
+import time
+from collections import Counter
+from itertools import product
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.memory_report import process_memory
+from modules.metrics import LatencyStats
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures" / "report_summaries.jsonl"
+
+# Templated header real reports carry; repeated to push the findings past
+# the model's input window, which is where input strategies differ
+BOILERPLATE = (
+    "This report is confidential and intended only for the named recipient. "
+    "Results should be interpreted in the context of the clinical history. "
+    "Please contact the reporting department with any questions about this document. "
+)
+
+
+def load_fixtures(path=FIXTURES_PATH, boilerplate=0):
+    with open(path, encoding="utf-8") as f:
+        fixtures = [json.loads(line) for line in f if line.strip()]
+    for fixture in fixtures:
+        fixture["report"] = BOILERPLATE * boilerplate + fixture["report"]
+    return fixtures
+
+
+# ---- ROUGE (F1), same tokenization for candidate and reference ----
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / candidate_total, overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate, reference, n):
+    cand = Counter(zip(*(candidate[i:] for i in range(n))))
+    ref = Counter(zip(*(reference[i:] for i in range(n))))
+    return _f1(sum((cand & ref).values()), sum(cand.values()), sum(ref.values()))
+
+
+def rouge_l(candidate, reference):
+    # Longest common subsequence, one row of the DP table at a time
+    previous = [0] * (len(reference) + 1)
+    for token in candidate:
+        current = [0]
+        for j, ref_token in enumerate(reference):
+            current.append(previous[j] + 1 if token == ref_token else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(candidate), len(reference))
+
+
+def rouge_scores(candidate, reference):
+    candidate, reference = _tokens(candidate), _tokens(reference)
+    return {
+        "rouge1": rouge_n(candidate, reference, 1),
+        "rouge2": rouge_n(candidate, reference, 2),
+        "rougeL": rouge_l(candidate, reference),
+    }
+
+
+def pareto_frontier(results, cost="p50", quality="rougeL"):
+    """Results no other result beats on both ``cost`` (lower) and ``quality`` (higher)."""
+    frontier = []
+    best_quality = float("-inf")
+    for result in sorted(results, key=lambda r: (r[cost], -r[quality])):
+        if result[quality] > best_quality:
+            frontier.append(result)
+            best_quality = result[quality]
+    return frontier
+
+
+# ---- Backends ----
+
+def load_backend(name):
+    import torch
+    from transformers import BartForConditionalGeneration
+    from modules.summarizer import MODEL_NAME, load_bart_model
+
+    tokenizer, model = load_bart_model()
+    if name == "fp32":
+        return tokenizer, model
+    if name == "int8":
+        return tokenizer, torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if name == "bf16":
+        return tokenizer, BartForConditionalGeneration.from_pretrained(MODEL_NAME, torch_dtype=torch.bfloat16).eval()
+    raise ValueError(f"Unknown backend {name!r}")
+
+
+def run_config(fixtures, tokenizer, model, max_length, min_length, settings):
+    import torch
+    from modules.summarizer import summarize
+
+    latency = LatencyStats()
+    totals = Counter()
+    with torch.inference_mode():
+        for fixture in fixtures:
+            start = time.perf_counter()
+            summary = summarize(fixture["report"], tokenizer, model, max_length, min_length, settings)
+            latency.record(time.perf_counter() - start)
+            totals.update(rouge_scores(summary, fixture["reference"]))
+
+    stats = latency.summary()
+    result = {name: value / len(fixtures) for name, value in totals.items()}
+    result.update(p50=stats["p50"], p95=stats["p95"], mean=stats["mean"])
+    return result
+
+
+def _csv_list(cast):
+    return lambda value: [cast(v) for v in value.split(",")]
+
+
+def main():
+    from modules.summarizer import DEFAULT_SETTINGS, INPUT_STRATEGIES
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_PATH)
+    parser.add_argument("--boilerplate", type=int, default=0,
+                        help="prepend this many copies of a templated header to every report")
+    parser.add_argument("--backends", type=_csv_list(str), default=["fp32", "int8"])
+    parser.add_argument("--beams", type=_csv_list(int), default=[1, 2, 4])
+    parser.add_argument("--length-penalties", type=_csv_list(float), default=[1.0, 1.5, 2.0])
+    parser.add_argument("--max-lengths", type=_csv_list(int), default=[120, 200])
+    parser.add_argument("--min-length", type=int, default=50)
+    parser.add_argument("--strategies", type=_csv_list(str), default=list(INPUT_STRATEGIES))
+    parser.add_argument("--max-input-tokens", type=int, default=DEFAULT_SETTINGS["max_input_tokens"])
+    parser.add_argument("--out", type=Path, help="write every result to this .csv or .json file")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures, args.boilerplate)
+    results = []
+    print(f"{'backend':<6} {'beams':>5} {'len_pen':>7} {'max_len':>7} {'strategy':<9} "
+          f"{'R-1':>6} {'R-2':>6} {'R-L':>6} {'p50 s':>7} {'p95 s':>7} {'RSS MB':>7} {'peak MB':>7}")
+    for backend in args.backends:
+        tokenizer, model = load_backend(backend)
+        # One untimed run so the first configuration doesn't pay for warm-up
+        run_config(fixtures[:1], tokenizer, model, 30, 5, {})
+
+        for beams, length_penalty, max_length, strategy in product(
+            args.beams, args.length_penalties, args.max_lengths, args.strategies
+        ):
+            settings = {
+                "num_beams": beams,
+                "length_penalty": length_penalty,
+                "input_strategy": strategy,
+                "max_input_tokens": args.max_input_tokens,
+            }
+            result = run_config(fixtures, tokenizer, model, max_length, args.min_length, settings)
+            result.update(
+                backend=backend, beams=beams, length_penalty=length_penalty,
+                max_length=max_length, strategy=strategy,
+                rss_mb=process_memory("self")["rss"] / 1024,
+                # ru_maxrss is KiB on Linux; it only grows, so read it per backend
+                peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            )
+            results.append(result)
+            print(f"{backend:<6} {beams:>5} {length_penalty:>7} {max_length:>7} {strategy:<9} "
+                  f"{result['rouge1']:>6.3f} {result['rouge2']:>6.3f} {result['rougeL']:>6.3f} "
+                  f"{result['p50']:>7.2f} {result['p95']:>7.2f} "
+                  f"{result['rss_mb']:>7.0f} {result['peak_rss_mb']:>7.0f}", flush=True)
+        del model
+
+    print("\nPareto frontier (p50 latency vs ROUGE-L):")
+    for r in pareto_frontier(results):
+        print(f"  {r['backend']:<6} beams={r['beams']} length_penalty={r['length_penalty']} "
+              f"max_length={r['max_length']} strategy={r['strategy']}  "
+              f"R-L={r['rougeL']:.3f}  p50={r['p50']:.2f}s")
+
+    if args.out:
+        if args.out.suffix == ".json":
+            args.out.write_text(json.dumps(results, indent=2))
+        else:
+            with open(args.out, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(results[0]))
+                writer.writeheader()
+                writer.writerows(results)
+        print(f"Wrote {len(results)} results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Memory budget for summaries: requests reserve their estimated working memory before they start."""
+
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from modules.metrics import LatencyStats
+
+# Working memory per process, and how long a request may wait for it (seconds)
+MEMORY_BUDGET_MB = float(os.environ.get("DOCWISE_SUMMARY_MEMORY_MB", "2048"))
+ADMISSION_TIMEOUT = float(os.environ.get("DOCWISE_ADMISSION_TIMEOUT", "30"))
+# Measured stages run one at a time, with tracemalloc snapshots (slow, for tuning the costs below)
+TRACE_MEMORY = os.environ.get("DOCWISE_TRACE_MEMORY", "0") == "1"
+
+# Cost model, in MB
+PAGE_COST_MB = 1.5          # parsed PDF objects and extracted text, per page
+TOKENS_PER_PAGE = 600       # used before the text is extracted
+GENERATION_BASE_MB = 150    # fixed overhead of one generate() call
+TOKEN_COST_MB = 0.12        # activations and cross-attention cache, per input token per beam
+
+TOP_ALLOCATIONS = 5
+
+# Seconds between RSS samples while a stage is measured
+RSS_SAMPLE_INTERVAL = 0.05
+# How often a request waiting for memory checks its cancel token (seconds)
+CANCEL_POLL_SECONDS = 0.1
+
+
+class AdmissionRejected(Exception):
+    """The request doesn't fit in the memory budget (at all, or in time)."""
+
+
+def estimate_cost_mb(pages, input_tokens, num_beams):
+    """Estimated working memory of a request: ``pages`` still to parse, then generation."""
+    return pages * PAGE_COST_MB + GENERATION_BASE_MB + input_tokens * num_beams * TOKEN_COST_MB
+
+
+class Reservation:
+    """Memory held by one admitted request; release it (or use ``with``) when done."""
+
+    def __init__(self, budget, cost_mb):
+        self.budget = budget
+        self.cost_mb = cost_mb
+
+    def shrink(self, cost_mb):
+        """Give back what the request no longer needs (never grows)."""
+        if cost_mb < self.cost_mb:
+            self.budget._release(self.cost_mb - cost_mb)
+            self.cost_mb = cost_mb
+
+    def release(self):
+        self.shrink(0.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class MemoryBudget:
+    """A counting semaphore over megabytes of working memory."""
+
+    def __init__(self, limit_mb=MEMORY_BUDGET_MB, timeout=ADMISSION_TIMEOUT):
+        self.limit_mb = limit_mb
+        self.timeout = timeout
+        self.in_use_mb = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.wait_time = LatencyStats()
+        self._cond = threading.Condition()
+
+    def reserve(self, cost_mb, timeout=None, cancel_token=None):
+        """Block until ``cost_mb`` fits, then return its Reservation.
+
+        ``timeout`` defaults to the budget's; pass ``float("inf")`` to wait
+        as long as it takes (queued jobs that must not be dropped). A
+        cancelled ``cancel_token`` ends the wait with GenerationCancelled.
+        """
+        if cost_mb > self.limit_mb:
+            with self._cond:
+                self.rejected += 1
+            raise AdmissionRejected(
+                f"request needs ~{cost_mb:.0f} MB, more than the {self.limit_mb:.0f} MB budget"
+            )
+
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_use_mb + cost_mb > self.limit_mb:
+                    remaining = started + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionRejected(
+                            f"memory budget busy ({self.in_use_mb:.0f} of {self.limit_mb:.0f} MB "
+                            f"in use), retry later"
+                        )
+                    if cancel_token is None:
+                        self._cond.wait(None if remaining == float("inf") else remaining)
+                    else:
+                        cancel_token.raise_if_cancelled()
+                        self._cond.wait(min(remaining, CANCEL_POLL_SECONDS))
+            finally:
+                self.waiting -= 1
+            self.in_use_mb += cost_mb
+            self.admitted += 1
+        self.wait_time.record(time.monotonic() - started)
+        return Reservation(self, cost_mb)
+
+    def _release(self, mb):
+        with self._cond:
+            self.in_use_mb = max(0.0, self.in_use_mb - mb)
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "limit_mb": self.limit_mb,
+            "in_use_mb": round(self.in_use_mb, 1),
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds": self.wait_time.summary(),
+        }
+
+
+budget = MemoryBudget()
+
+
+# ---- Per-stage measurement ----
+
+def _rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * (os.sysconf("SC_PAGE_SIZE") // 1024)
+
+
+class _RssSampler:
+    """Tracks the highest RSS seen by every stage currently being measured.
+
+    Sampling instead of resetting VmHWM: a reset is process-wide and
+    would lower the peak of a stage running in another thread.
+    """
+
+    def __init__(self):
+        self._peaks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Register a stage; returns its key."""
+        key = object()
+        with self._lock:
+            self._peaks[key] = _rss_kb()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="docwise-rss-sampler", daemon=True)
+                self._thread.start()
+        return key
+
+    def stop(self, key):
+        """Unregister a stage; returns the highest RSS (KiB) seen while it ran."""
+        rss = _rss_kb()
+        with self._lock:
+            return max(self._peaks.pop(key), rss)
+
+    def _run(self):
+        while True:
+            time.sleep(RSS_SAMPLE_INTERVAL)
+            rss = _rss_kb()
+            with self._lock:
+                if not self._peaks:
+                    self._thread = None
+                    return
+                for key, peak in self._peaks.items():
+                    self._peaks[key] = max(peak, rss)
+
+
+_sampler = _RssSampler()
+
+
+class StageMemory:
+    def __init__(self):
+        self.peak_delta_mb = LatencyStats()
+        self.traced_peak_mb = LatencyStats()
+        self.top_allocations = []
+
+    def summary(self):
+        return {
+            "peak_rss_delta_mb": self.peak_delta_mb.summary(),
+            "traced_peak_mb": self.traced_peak_mb.summary() if TRACE_MEMORY else None,
+            "top_allocations": self.top_allocations,
+        }
+
+
+_stages = {}
+_stages_lock = threading.Lock()
+# Held for a whole stage when tracing, so tracemalloc's peak is the stage's own
+_trace_lock = threading.Lock()
+
+
+@contextmanager
+def measure_stage(name):
+    """Record peak RSS growth (and tracemalloc stats if enabled) of the block."""
+    with _stages_lock:
+        stage = _stages.setdefault(name, StageMemory())
+
+    before = None
+    if TRACE_MEMORY:
+        _trace_lock.acquire()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+    start_kb = _rss_kb()
+    key = _sampler.start()
+
+    try:
+        yield
+    finally:
+        stage.peak_delta_mb.record(max(0, _sampler.stop(key) - start_kb) / 1024)
+        if before is not None:
+            try:
+                stage.traced_peak_mb.record(tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+                diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+                stage.top_allocations = [str(stat) for stat in diff[:TOP_ALLOCATIONS]]
+            finally:
+                _trace_lock.release()
+
+
+def memory_stats():
+    """Budget state plus per-stage measurements, for /stats and the dashboard."""
+    with _stages_lock:
+        stages = dict(_stages)
+    return {
+        "rss_mb": round(_rss_kb() / 1024, 1),
+        "budget": budget.stats(),
+        "stages": {name: stage.summary() for name, stage in stages.items()},
+    }
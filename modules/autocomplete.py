@@ -0,0 +1,126 @@
+"""
+Prefix autocomplete for the disease and location inputs.
+
+Each term is indexed under its full name and under every later word
+("high blood pressure" is also found by "blood" and "pressure"), in one
+sorted array searched with bisect. Matches are ranked by how many
+doctors can actually be offered for them. When no prefix matches (a
+typo), the closest spellings are suggested instead. Indexes are rebuilt
+per data snapshot, off the request path.
+"""
+
+import bisect
+import difflib
+import heapq
+import threading
+
+from modules.data_store import DOCTOR_BACKEND, add_reload_listener, get_snapshot
+
+if DOCTOR_BACKEND == "sqlite":
+    from modules import sqlite_store
+
+DEFAULT_LIMIT = 8
+MAX_FUZZY_CACHE = 10000
+
+
+class PrefixIndex:
+    def __init__(self, terms, weights):
+        entries = []
+        self.weights = {}
+        for term, weight in zip(terms, weights):
+            self.weights[term] = weight
+            words = term.lower().split()
+            for i in range(len(words)):
+                entries.append((" ".join(words[i:]), i > 0, term))
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.inner = [inner for _, inner, _ in entries]
+        self.terms = [term for _, _, term in entries]
+        self.lowered = {term.lower(): term for term in self.weights}
+        self._fuzzy_cache = {}
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT):
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\uffff", lo)
+        if lo < hi:
+            # Names that start with the prefix beat ones that only contain a word starting with it
+            matches = {}
+            for term, inner in zip(self.terms[lo:hi], self.inner[lo:hi]):
+                matches[term] = min(inner, matches.get(term, True))
+            return heapq.nsmallest(
+                limit, matches, key=lambda t: (matches[t], -self.weights[t], t)
+            )
+
+        # Nothing starts with it: probably a typo, offer the closest spellings.
+        # Fuzzy matching is the slow path, so remember the answers
+        key = (prefix, limit)
+        close = self._fuzzy_cache.get(key)
+        if close is None:
+            close = [
+                self.lowered[c]
+                for c in difflib.get_close_matches(prefix, self.lowered, n=limit, cutoff=0.6)
+            ]
+            if len(self._fuzzy_cache) >= MAX_FUZZY_CACHE:
+                self._fuzzy_cache.clear()
+            self._fuzzy_cache[key] = close
+        return close
+
+
+class SuggestionIndexes:
+    def __init__(self, snapshot):
+        self.version = snapshot.version
+
+        # Weight each disease by the number of doctors of its specialty
+        if DOCTOR_BACKEND == "sqlite":
+            doctors_per_specialist = sqlite_store.specialist_counts()
+        else:
+            doctors_per_specialist = {spec: len(rows) for spec, rows in snapshot.specialist_rows.items()}
+        diseases = snapshot.disease_df.drop_duplicates("Disease")
+        self.diseases = PrefixIndex(
+            [snapshot.disease_names.get(d, d) for d in diseases["Disease"]],
+            [doctors_per_specialist.get(s.lower(), 0) for s in diseases["Specialist"]],
+        )
+
+        if DOCTOR_BACKEND == "sqlite":
+            locations = sqlite_store.location_counts()
+            self.locations = PrefixIndex([name for name, _ in locations], [count for _, count in locations])
+        else:
+            locations = snapshot.doctor_df["Location"].astype(str).str.strip().value_counts()
+            self.locations = PrefixIndex(locations.index.tolist(), locations.tolist())
+
+
+_indexes = None
+_lock = threading.Lock()
+
+
+def _get_indexes():
+    global _indexes
+    snapshot = get_snapshot()
+    indexes = _indexes
+    if indexes is None or indexes.version != snapshot.version:
+        indexes = SuggestionIndexes(snapshot)
+        with _lock:
+            _indexes = indexes
+    return indexes
+
+
+def suggest_diseases(prefix, limit=DEFAULT_LIMIT):
+    return _get_indexes().diseases.suggest(prefix, limit)
+
+
+def suggest_locations(prefix, limit=DEFAULT_LIMIT):
+    return _get_indexes().locations.suggest(prefix, limit)
+
+
+def _rebuild(old_snapshot, new_snapshot):
+    global _indexes
+    indexes = SuggestionIndexes(new_snapshot)
+    with _lock:
+        _indexes = indexes
+
+
+add_reload_listener(_rebuild)
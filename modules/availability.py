@@ -0,0 +1,119 @@
+"""
+Availability matrix: qualified doctors per (specialist, city).
+
+"Qualified" uses the patient dashboard's thresholds (at least
+MIN_EXPERIENCE years, rating at least MIN_RATING). The matrix is
+materialized once per data snapshot and then served from memory. It
+reuses the snapshot's own indexes (specialist rows, factorized location
+codes): every doctor maps to a cell (specialist code * cities + city
+code), and one np.bincount over the qualified cells produces every count
+at once.
+
+A reload recounts the new snapshot in the reload listener, off the
+request path. Recounting from the indexes is cheaper than diffing the
+two snapshots row by row, and only labels present in the new snapshot
+appear. With the sqlite backend one GROUP BY counts the cells instead.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modules.data_store import DOCTOR_BACKEND, add_reload_listener, get_snapshot
+
+if DOCTOR_BACKEND == "sqlite":
+    from modules import sqlite_store
+
+# Same thresholds as the patient dashboard's search
+MIN_EXPERIENCE = 2
+MIN_RATING = 3.5
+
+
+class AvailabilityMatrix:
+    def __init__(self, snapshot, min_experience=MIN_EXPERIENCE, min_rating=MIN_RATING):
+        self.version = snapshot.version
+        self.min_experience = min_experience
+        self.min_rating = min_rating
+        self._frame = None
+        if DOCTOR_BACKEND == "sqlite":
+            self._count_database()
+        else:
+            self._count_snapshot(snapshot)
+
+    def _count_snapshot(self, snapshot):
+        min_experience, min_rating = self.min_experience, self.min_rating
+        self.specialists = {name: code for code, name in enumerate(snapshot.specialist_rows)}
+        self.cities = snapshot.location_code_by_key
+        self.specialist_labels, self.city_labels = snapshot.specialist_labels, snapshot.location_labels
+
+        doctor_df = snapshot.doctor_df
+        specialist_codes = np.full(len(doctor_df), -1, dtype=np.int64)
+        for code, rows in enumerate(snapshot.specialist_rows.values()):
+            specialist_codes[rows] = code
+        city_codes = np.asarray(snapshot.location_codes, dtype=np.int64)
+
+        experience = doctor_df["Experience"].to_numpy()
+        rating = np.nan_to_num(doctor_df["Rating"].to_numpy(dtype=np.float64), nan=-np.inf)
+        qualified = (experience >= min_experience) & (rating >= min_rating)
+        qualified &= (specialist_codes >= 0) & (city_codes >= 0)
+
+        shape = (len(self.specialists), len(self.cities))
+        cells = specialist_codes[qualified] * shape[1] + city_codes[qualified]
+        self.counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+
+    def _count_database(self):
+        rows = sqlite_store.qualified_counts(self.min_experience, self.min_rating)
+        self.specialist_labels, self.city_labels = sqlite_store.display_labels()
+        self.specialists = {name: code for code, name in enumerate(sorted({row[0] for row in rows}))}
+        self.cities = {name: code for code, name in enumerate(sorted({row[1] for row in rows}))}
+        self.counts = np.zeros((len(self.specialists), len(self.cities)), dtype=np.int64)
+        for specialist, city, count in rows:
+            self.counts[self.specialists[specialist], self.cities[city]] = count
+
+    def frame(self):
+        """Counts as a DataFrame: specialists by cities, busiest first, with totals."""
+        if self._frame is None:
+            frame = pd.DataFrame(
+                self.counts,
+                index=[self.specialist_labels.get(name, name) for name in self.specialists],
+                columns=[self.city_labels.get(name, name) for name in self.cities],
+            )
+            frame = frame.loc[
+                frame.sum(axis=1).sort_values(ascending=False, kind="stable").index,
+                frame.sum(axis=0).sort_values(ascending=False, kind="stable").index,
+            ]
+            frame.insert(0, "Total", frame.sum(axis=1))
+            self._frame = frame
+        return self._frame
+
+    def count(self, specialist, city):
+        i = self.specialists.get(specialist.strip().lower())
+        j = self.cities.get(city.strip().lower())
+        return 0 if i is None or j is None else int(self.counts[i, j])
+
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+def get_matrix():
+    """The availability matrix for the live snapshot."""
+    global _matrix
+    snapshot = get_snapshot()
+    with _matrix_lock:
+        if _matrix is None or _matrix.version != snapshot.version:
+            _matrix = AvailabilityMatrix(snapshot)
+        return _matrix
+
+
+def _on_reload(old_snapshot, new_snapshot):
+    global _matrix
+    # Only once someone has asked for it; counted before taking the lock
+    if _matrix is not None and _matrix.version != new_snapshot.version:
+        matrix = AvailabilityMatrix(new_snapshot)
+        with _matrix_lock:
+            _matrix = matrix
+
+
+add_reload_listener(_on_reload)
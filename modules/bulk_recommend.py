@@ -0,0 +1,149 @@
+"""
+Bulk doctor recommendations for triage batches.
+
+Resolves a whole table of (condition, location) rows against the disease
+map in one vectorized join, then takes the top-k doctors per
+(specialist, location) group in a single grouped pass over the
+directory. Results stream out chunk by chunk as CSV or JSON Lines.
+
+Usage:
+    python -m modules.bulk_recommend intake.csv -o results.jsonl --format jsonl
+"""
+
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from modules import ranking
+from modules.data_store import DOCTOR_BACKEND, get_snapshot
+
+if DOCTOR_BACKEND == "sqlite":
+    from modules import sqlite_store
+
+DOCTOR_COLUMNS = ["Name", "Specialist", "Location", "Experience", "Contact", "Rating"]
+
+
+def _normalize(series):
+    # Batches repeat the same few values, so normalize each distinct one once
+    codes, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=False)
+    normalized = pd.Index(uniques).fillna("").astype(str).str.strip().str.lower()
+    return pd.Series(normalized.to_numpy()[codes], index=series.index)
+
+
+def _top_doctors(snapshot, top_k, min_experience, min_rating):
+    """Top ``top_k`` qualified doctors per (specialist, location) and per specialist."""
+    if DOCTOR_BACKEND == "sqlite":
+        qualified = sqlite_store.get_doctors(min_experience, min_rating)[DOCTOR_COLUMNS]
+    else:
+        doctors = snapshot.doctor_df
+        mask = doctors["Experience"] >= min_experience
+        if min_rating is not None:
+            mask &= doctors["Rating"] >= min_rating
+        qualified = doctors.loc[mask, DOCTOR_COLUMNS].copy()
+    qualified["specialist_key"] = qualified["Specialist"].astype(str)
+    qualified["location_key"] = _normalize(qualified["Location"].astype(str))
+    # Composite score, like the app and the HTTP service
+    qualified = ranking.rank_frame(qualified)
+
+    by_location = qualified.groupby(["specialist_key", "location_key"], sort=False).head(top_k)
+    by_location = by_location.assign(rank=by_location.groupby(["specialist_key", "location_key"]).cumcount() + 1)
+
+    # Rows without a location get the best doctors of the specialty anywhere
+    anywhere = qualified.groupby("specialist_key", sort=False).head(top_k)
+    anywhere = anywhere.assign(location_key="", rank=anywhere.groupby("specialist_key").cumcount() + 1)
+
+    return pd.concat([by_location, anywhere], ignore_index=True)
+
+
+def recommend_bulk(requests_df, top_k=5, min_experience=0, min_rating=None,
+                   condition_column="condition", location_column="location", top_doctors=None):
+    """Recommend doctors for every row of ``requests_df``.
+
+    Returns one row per (request, doctor), or a single row with empty
+    doctor fields and a ``status`` explaining why nothing matched.
+    """
+    snapshot = get_snapshot()
+    if top_doctors is None:
+        top_doctors = _top_doctors(snapshot, top_k, min_experience, min_rating)
+
+    requests = pd.DataFrame({
+        "request_row": requests_df.index,
+        "condition": requests_df[condition_column].to_numpy(),
+        "location": requests_df[location_column].to_numpy()
+        if location_column in requests_df.columns else "",
+    })
+    disease_keys = _normalize(requests["condition"])
+    requests["recommended_specialist"] = disease_keys.map(snapshot.specialist_by_disease)
+    requests["specialist_key"] = _normalize(requests["recommended_specialist"])
+    requests["location_key"] = _normalize(requests["location"])
+
+    results = requests.merge(top_doctors, on=["specialist_key", "location_key"], how="left")
+    results["status"] = "ok"
+    results.loc[results["Name"].isna(), "status"] = "no_doctors"
+    results.loc[results["recommended_specialist"].isna(), "status"] = "unknown_condition"
+
+    results = results.sort_values(["request_row", "rank"], kind="stable")
+    # Keep integer columns integral even where no doctor matched
+    results = results.astype({"rank": "Int64", "Experience": "Int64", "Contact": "Int64"})
+    columns = ["request_row", "condition", "location", "recommended_specialist", "status", "rank"]
+    return results[columns + DOCTOR_COLUMNS].reset_index(drop=True)
+
+
+def run_bulk(input_path, output, fmt="csv", top_k=5, min_experience=0, min_rating=None,
+             condition_column="condition", location_column="location", chunksize=50000):
+    """Stream ``input_path`` through recommend_bulk chunk by chunk.
+
+    Returns ``(input_rows, output_rows, seconds)``.
+    """
+    start_time = time.perf_counter()
+    top_doctors = _top_doctors(get_snapshot(), top_k, min_experience, min_rating)
+    input_rows = output_rows = 0
+
+    for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype=str, keep_default_na=False):
+        results = recommend_bulk(
+            chunk, top_k, min_experience, min_rating,
+            condition_column, location_column, top_doctors=top_doctors
+        )
+        if fmt == "jsonl":
+            results.to_json(output, orient="records", lines=True)
+        else:
+            results.to_csv(output, index=False, header=input_rows == 0)
+        input_rows += len(chunk)
+        output_rows += len(results)
+
+    return input_rows, output_rows, time.perf_counter() - start_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk doctor recommendations for a CSV of patients")
+    parser.add_argument("input", help="CSV with a condition column and an optional location column")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-experience", type=int, default=2)
+    parser.add_argument("--min-rating", type=float, default=3.5)
+    parser.add_argument("--condition-column", default="condition")
+    parser.add_argument("--location-column", default="location")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        input_rows, output_rows, seconds = run_bulk(
+            args.input, output, args.format, args.top_k, args.min_experience,
+            args.min_rating, args.condition_column, args.location_column
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(
+        f"{input_rows} rows -> {output_rows} results in {seconds:.2f}s "
+        f"({input_rows / seconds if seconds else 0:,.0f} rows/s)",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Compact columnar copy of doctor_profiles.csv.
+
+Each column is stored as its own .npy file so it can be memory-mapped
+instead of parsed: Specialist and Location are dictionary-encoded
+(narrow integer codes + a short category list), Experience uses the
+narrowest unsigned int that fits, Rating is float64 (as parsed from the
+CSV, so rating filters compare the same) and Contact int64.
+Name is nearly unique per doctor, so a dictionary would just be a copy
+of the column: it is stored as one UTF-8 byte array plus row offsets.
+meta.json records the dtypes, categories and the CSV it was built from.
+
+Name is the one column that costs per-row work on load: its Python
+strings are cut out of the byte array (a single pass, no parsing).
+Everything else is a memory map.
+
+Build it with:  python -m modules.columnar_store [csv_path] [out_dir]
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCTOR_CSV_PATH = os.path.join(BASE_DIR, "data", "doctor_profiles.csv")
+DOCTOR_COLUMNAR_DIR = os.path.join(BASE_DIR, "data", "doctor_profiles.columns")
+
+CATEGORICAL_COLUMNS = ["Specialist", "Location"]
+STRING_COLUMNS = ["Name"]
+FLOAT_COLUMNS = ["Rating"]
+
+META_FILE = "meta.json"
+FORMAT_VERSION = 3
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _narrow_int_dtype(values):
+    # Smallest integer type that can hold every value
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def write_columnar(df, out_dir, source_stamp=None):
+    """Write ``df`` as one .npy file per column plus meta.json."""
+    os.makedirs(out_dir, exist_ok=True)
+    columns = []
+
+    for name in df.columns:
+        series = df[name]
+        spec = {"name": name}
+
+        if name in STRING_COLUMNS:
+            encoded = [value.encode("utf-8") for value in series.astype(str)]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            values = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            np.save(os.path.join(out_dir, f"{name}.offsets.npy"), offsets)
+            spec["kind"] = "string"
+            # Character offsets equal byte offsets, so the text can be decoded in one go
+            spec["ascii"] = bool(values.max(initial=0) < 128)
+        elif name in CATEGORICAL_COLUMNS:
+            categorical = pd.Categorical(series)
+            codes = categorical.codes
+            values = codes.astype(_narrow_int_dtype(codes))
+            spec["kind"] = "category"
+            spec["categories"] = [str(c) for c in categorical.categories]
+        elif name in FLOAT_COLUMNS:
+            values = series.to_numpy(dtype=np.float64)
+            spec["kind"] = "float"
+        elif pd.api.types.is_integer_dtype(series):
+            values = series.to_numpy()
+            values = values.astype(_narrow_int_dtype(values))
+            spec["kind"] = "int"
+        else:
+            raise ValueError(f"Column {name!r} has no compact encoding")
+
+        np.save(os.path.join(out_dir, f"{name}.npy"), values)
+        spec["dtype"] = values.dtype.str
+        columns.append(spec)
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "rows": len(df),
+        "columns": columns,
+        "source": source_stamp,
+    }
+    # Write meta last so a half-built directory is never considered valid
+    tmp_path = os.path.join(out_dir, META_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(out_dir, META_FILE))
+
+
+def build_from_csv(csv_path=DOCTOR_CSV_PATH, out_dir=DOCTOR_COLUMNAR_DIR):
+    """Convert the CSV into the columnar format."""
+    df = pd.read_csv(csv_path)
+    write_columnar(df, out_dir, _source_stamp(csv_path))
+    return out_dir
+
+
+def _read_meta(out_dir):
+    try:
+        with open(os.path.join(out_dir, META_FILE)) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get("format_version") != FORMAT_VERSION:
+        return None
+    return meta
+
+
+def is_fresh(out_dir=DOCTOR_COLUMNAR_DIR, csv_path=DOCTOR_CSV_PATH):
+    """True if ``out_dir`` holds a columnar copy of the current CSV."""
+    meta = _read_meta(out_dir)
+    if meta is None:
+        return False
+    try:
+        return meta["source"] == _source_stamp(csv_path)
+    except FileNotFoundError:
+        # No CSV at all, the columnar copy is the only source
+        return True
+
+
+def _cut_strings(buffer, offsets, ascii):
+    """Object array of the strings between consecutive ``offsets`` of a UTF-8 buffer."""
+    if ascii:
+        text = buffer.tobytes().decode("ascii")
+        strings = [text[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    else:
+        data = buffer.tobytes()
+        strings = [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+    array = np.empty(len(strings), dtype=object)
+    array[:] = strings
+    return array
+
+
+def load_columnar(out_dir=DOCTOR_COLUMNAR_DIR, mmap=True):
+    """Load the columnar copy as a DataFrame backed by memory-mapped arrays."""
+    meta = _read_meta(out_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No columnar data in {out_dir}")
+
+    mmap_mode = "r" if mmap else None
+    data = {}
+    for spec in meta["columns"]:
+        values = np.load(os.path.join(out_dir, f"{spec['name']}.npy"), mmap_mode=mmap_mode)
+        if spec["kind"] == "category":
+            data[spec["name"]] = pd.Categorical.from_codes(
+                values, categories=pd.Index(spec["categories"]), validate=False
+            )
+        elif spec["kind"] == "string":
+            offsets = np.load(os.path.join(out_dir, f"{spec['name']}.offsets.npy")).tolist()
+            data[spec["name"]] = _cut_strings(values, offsets, spec["ascii"])
+        else:
+            data[spec["name"]] = values
+
+    return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DOCTOR_CSV_PATH
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else DOCTOR_COLUMNAR_DIR
+    build_from_csv(csv_path, out_dir)
+    print(f"Wrote columnar doctor profiles to {out_dir}")
@@ -0,0 +1,246 @@
+import gc
+import glob
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules import columnar_store
+
+# Absolute paths of the CSVs, no matter where you run from
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DOCTOR_CSV_PATH = os.path.join(DATA_DIR, "doctor_profiles.csv")
+DISEASE_CSV_PATH = os.path.join(DATA_DIR, "disease_to_doctor.csv")
+
+# Where doctor queries run: "memory" (pandas), "sqlite" (modules/sqlite_store.py)
+# or "sharded" (worker processes, modules/sharded_directory.py)
+DOCTOR_BACKEND = os.environ.get("DOCWISE_DOCTOR_BACKEND", "memory")
+
+# How often the watcher checks data/*.csv for changes (seconds)
+WATCH_INTERVAL = float(os.environ.get("DOCWISE_DATA_WATCH_INTERVAL", "2.0"))
+
+logger = logging.getLogger(__name__)
+
+NO_ROWS = np.empty(0, dtype=np.int64)
+
+
+class DataSnapshot:
+    """One consistent, read-only version of the doctor and disease data.
+
+    Queries grab the current snapshot once and use it to the end, so a
+    reload that swaps in a new snapshot never changes data under them.
+    The lookup indexes are derived here, once per load, so query code
+    never has to normalize or scan the raw columns. With the sqlite
+    backend doctor_df holds only the columns; the rows stay in the database.
+    """
+
+    def __init__(self, doctor_df, disease_df, version, file_mtimes, disease_names=None, specialist_labels=None):
+        self.doctor_df = doctor_df
+        self.disease_df = disease_df
+        self.version = version
+        self.file_mtimes = file_mtimes
+        self.loaded_at = time.time()
+        # Lower-cased disease / specialist -> name as written in the CSV, for display
+        self.disease_names = disease_names or {}
+        self.specialist_labels = specialist_labels or {}
+
+        # Disease (lower-case) -> specialist, first row wins like the old lookup
+        first_rows = disease_df.drop_duplicates("Disease", keep="first")
+        self.specialist_by_disease = dict(zip(first_rows["Disease"], first_rows["Specialist"]))
+
+        # Specialist (lower-case) -> positions of its doctors in doctor_df
+        self.specialist_rows = {
+            specialist: rows.astype(np.int64)
+            for specialist, rows in doctor_df.groupby("Specialist", observed=True).indices.items()
+        }
+
+        # Integer code per doctor for the normalized Location, plus the reverse map
+        codes, uniques = pd.factorize(_strip_lower(doctor_df["Location"]))
+        self.location_codes = codes
+        self.location_code_by_key = {key: code for code, key in enumerate(uniques)}
+        # Normalized location -> its first spelling in the CSV, for display
+        self.location_labels = dict(zip(uniques, _first_labels(doctor_df["Location"], codes)))
+
+    def rows_for(self, specialist, location=None):
+        """Positions in doctor_df matching a normalized specialist and location."""
+        rows = self.specialist_rows.get(specialist, NO_ROWS)
+        if location:
+            code = self.location_code_by_key.get(location, -1)
+            rows = rows[self.location_codes[rows] == code]
+        return rows
+
+
+def _data_file_mtimes():
+    mtimes = {}
+    paths = glob.glob(os.path.join(DATA_DIR, "*.csv"))
+    paths += glob.glob(os.path.join(DATA_DIR, "*.columns", columnar_store.META_FILE))
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            # File removed between glob and stat
+            pass
+    return mtimes
+
+
+def _strip_lower(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Normalize the (few) categories instead of every row
+        categories = series.cat.categories.str.strip().str.lower()
+        if categories.is_unique:
+            return series.cat.rename_categories(categories)
+    return series.str.strip().str.lower()
+
+
+def _first_labels(series, codes):
+    """Stripped first value of ``series`` for each code of ``codes``, by code."""
+    _, first_rows = np.unique(codes[codes >= 0], return_index=True)
+    return series[codes >= 0].iloc[first_rows].astype(str).str.strip().tolist()
+
+
+def load_doctor_df():
+    # Prefer the memory-mapped columnar copy when it matches the CSV
+    if columnar_store.is_fresh(columnar_store.DOCTOR_COLUMNAR_DIR, DOCTOR_CSV_PATH):
+        return columnar_store.load_columnar(columnar_store.DOCTOR_COLUMNAR_DIR)
+    return pd.read_csv(DOCTOR_CSV_PATH)
+
+
+def make_snapshot(doctor_df, disease_df, version=1, file_mtimes=None):
+    """Normalize raw doctor/disease frames into a snapshot (modifies them)."""
+    specialists = doctor_df["Specialist"]
+    doctor_df["Specialist"] = _strip_lower(specialists)
+    codes, uniques = pd.factorize(doctor_df["Specialist"])
+    specialist_labels = dict(zip(uniques, _first_labels(specialists, codes)))
+
+    names = disease_df["Disease"].str.strip()
+    disease_df["Disease"] = names.str.lower()
+    disease_df["Specialist"] = disease_df["Specialist"].str.strip()
+    disease_names = dict(zip(disease_df["Disease"], names))
+
+    return DataSnapshot(doctor_df, disease_df, version, file_mtimes or {}, disease_names, specialist_labels)
+
+
+def load_snapshot(version=1):
+    """Read the CSVs and build a new snapshot (does not make it live)."""
+    file_mtimes = _data_file_mtimes()
+    if DOCTOR_BACKEND == "sqlite":
+        # Only the header: modules/sqlite_store.py reads the rows into the database
+        doctor_df = pd.read_csv(DOCTOR_CSV_PATH, nrows=0)
+    else:
+        doctor_df = load_doctor_df()
+    return make_snapshot(doctor_df, pd.read_csv(DISEASE_CSV_PATH), version, file_mtimes)
+
+
+class DataRepository:
+    """Owns the live snapshot for the whole process.
+
+    Every module reads doctors and diseases through the shared
+    ``repository`` below, so each worker parses the data once and keeps
+    a single copy of it.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._reload_listeners = []
+        self._watcher = None
+
+    def get_snapshot(self):
+        """Return the live snapshot, loading it on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = load_snapshot()
+                snapshot = self._snapshot
+        return snapshot
+
+    def add_reload_listener(self, callback):
+        """Call ``callback(old_snapshot, new_snapshot)`` after every reload."""
+        self._reload_listeners.append(callback)
+
+    def reload_if_changed(self, force=False):
+        """Rebuild and swap in a new snapshot if any data/*.csv file changed.
+
+        Returns True when a new snapshot went live.
+        """
+        current = self.get_snapshot()
+        if not force and _data_file_mtimes() == current.file_mtimes:
+            return False
+
+        start_time = time.perf_counter()
+        try:
+            new_snapshot = load_snapshot(current.version + 1)
+        except Exception:
+            # Most likely a file caught mid-write; keep serving the old data
+            logger.exception("Data reload failed, keeping snapshot v%d", current.version)
+            return False
+
+        if not force and _data_file_mtimes() != new_snapshot.file_mtimes:
+            # Files changed again while we were reading them, retry next poll
+            return False
+
+        self.replace_snapshot(new_snapshot)
+        logger.info(
+            "Reloaded data snapshot v%d in %.1f ms (%d doctors, %d diseases)",
+            new_snapshot.version,
+            (time.perf_counter() - start_time) * 1000,
+            len(new_snapshot.doctor_df),
+            len(new_snapshot.disease_df),
+        )
+        return True
+
+    def replace_snapshot(self, new_snapshot):
+        """Make ``new_snapshot`` live and notify the reload listeners."""
+        with self._lock:
+            old_snapshot = self._snapshot
+            self._snapshot = new_snapshot
+
+        for callback in list(self._reload_listeners):
+            try:
+                callback(old_snapshot, new_snapshot)
+            except Exception:
+                logger.exception("Reload listener %r failed", callback)
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload_if_changed()
+            except Exception:
+                logger.exception("Data watcher iteration failed")
+
+    def start_watcher(self, interval=WATCH_INTERVAL):
+        """Start the background thread that hot-reloads data/*.csv (idempotent)."""
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(
+                    target=self._watch, args=(interval,), name="docwise-data-watcher", daemon=True
+                )
+                self._watcher.start()
+        return self._watcher
+
+    def preload_for_fork(self):
+        """Load everything in a parent process before it forks workers.
+
+        Children inherit the snapshot copy-on-write. Freezing the GC keeps
+        collections in the children from touching (and so copying) the
+        inherited pages. Call it once, right before forking.
+        """
+        snapshot = self.get_snapshot()
+        gc.collect()
+        gc.freeze()
+        return snapshot
+
+
+repository = DataRepository()
+
+get_snapshot = repository.get_snapshot
+add_reload_listener = repository.add_reload_listener
+reload_if_changed = repository.reload_if_changed
+start_watcher = repository.start_watcher
+preload_for_fork = repository.preload_for_fork
@@ -1,25 +1,10 @@
-import pandas as pd
-import os
-
-# Get absolute path of the CSV
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CSV_PATH = os.path.join(BASE_DIR, "data", "disease_to_doctor.csv")
-
-# Load CSV
-disease_df = pd.read_csv(CSV_PATH)
+from modules.data_store import get_snapshot
+from modules.query_log import log_query
 
 def predict_specialist(disease_name):
     # Normalize input
     disease_name = disease_name.strip().lower()
+    log_query("specialist", disease_name=disease_name)
 
-    # Normalize CSV columns
-    disease_df['Disease'] = disease_df['Disease'].str.strip().str.lower()
-    disease_df['Specialist'] = disease_df['Specialist'].str.strip()
-
-    # Match disease
-    match = disease_df[disease_df['Disease'] == disease_name]
-
-    if not match.empty:
-        return match['Specialist'].values[0]
-    else:
-        return None
+    # Match disease against the snapshot's prebuilt lookup
+    return get_snapshot().specialist_by_disease.get(disease_name)
@@ -0,0 +1,92 @@
+import html
+
+# Rendered card fragments, keyed by doctor id (Contact) plus the displayed
+# fields so an edited profile never shows a stale card
+_card_cache = {}
+MAX_CACHED_CARDS = 50000
+
+CARD_HEAD = (
+    '<div class="doctor-card">'
+    '<div style="display: flex; justify-content: space-between; align-items: center;">'
+    '<div>'
+    '<h3 style="margin: 0; color: #1193d4;">#'
+)
+
+CARD_BODY = (
+    ' {name}</h3>'
+    '<p style="margin: 5px 0; color: #666;">'
+    '👨‍⚕️ {specialist} | 💼 {experience} years experience | ⭐ {rating}/5.0'
+    '</p>'
+    '<p style="margin: 5px 0; color: #666;">🏢 {location} | 📞 {contact}</p>'
+    '</div>'
+    '<div style="text-align: center; padding: 1rem;">'
+    '<div class="doctor-rating-badge">{rating}</div>'
+    '<p style="margin: 5px 0; font-size: 0.8rem;">Rating</p>'
+    '</div>'
+    '</div>'
+    '</div>'
+)
+
+RESULTS_CSS = """
+<style>
+    .doctor-results {
+        max-height: 75vh;
+        overflow-y: auto;
+        padding-right: 0.5rem;
+    }
+    /* Let the browser skip layout and paint for cards scrolled out of view */
+    .doctor-results .doctor-card {
+        content-visibility: auto;
+        contain-intrinsic-size: auto 140px;
+    }
+    .doctor-rating-badge {
+        background: linear-gradient(135deg, #1193d4 0%, #0e7ab8 100%);
+        color: white;
+        border-radius: 50%;
+        width: 60px;
+        height: 60px;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-size: 1.5rem;
+        font-weight: bold;
+    }
+</style>
+"""
+
+
+def _card_fragment(name, specialist, experience, rating, location, contact):
+    key = (contact, name, specialist, experience, rating, location)
+    fragment = _card_cache.get(key)
+    if fragment is None:
+        if len(_card_cache) >= MAX_CACHED_CARDS:
+            _card_cache.clear()
+        fragment = CARD_BODY.format(
+            name=html.escape(str(name)),
+            specialist=html.escape(str(specialist)),
+            experience=experience,
+            rating=rating,
+            location=html.escape(str(location)),
+            contact=html.escape(str(contact)),
+        )
+        _card_cache[key] = fragment
+    return fragment
+
+
+def build_doctor_cards_html(doctors_df):
+    """Build the HTML for all result cards in a single pass."""
+    # Work on plain column arrays instead of boxing every row into a Series
+    columns = zip(
+        doctors_df["Name"].to_numpy(),
+        doctors_df["Specialist"].to_numpy(),
+        doctors_df["Experience"].to_numpy(),
+        doctors_df["Rating"].to_numpy(),
+        doctors_df["Location"].to_numpy(),
+        doctors_df["Contact"].to_numpy(),
+    )
+
+    cards = [
+        CARD_HEAD + str(rank) + _card_fragment(*row)
+        for rank, row in enumerate(columns, 1)
+    ]
+    return RESULTS_CSS + '<div class="doctor-results">' + "".join(cards) + "</div>"
@@ -1,22 +1,66 @@
-import os
-import pandas as pd
+import numpy as np
 
-# get the absolute path to the CSV, no matter where you run from
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CSV_PATH = os.path.join(BASE_DIR, "data", "doctor_profiles.csv")
+from modules import ranking
+from modules.data_store import DOCTOR_BACKEND, get_snapshot
+from modules.query_log import log_query
 
-doctor_df = pd.read_csv(CSV_PATH)
+if DOCTOR_BACKEND == "sqlite":
+    from modules import sqlite_store
+elif DOCTOR_BACKEND == "sharded":
+    from modules import sharded_directory
 
-def get_doctors_by_specialist(specialist, location=None, min_experience=0, min_rating=None):
-    # Ensure consistent formatting
-    doctor_df['Specialist'] = doctor_df['Specialist'].str.strip().str.lower()
+def get_doctors_by_specialist(specialist, location=None, min_experience=0, min_rating=None,
+                              ranked=False, distance_km=None, k=None):
+    # ranked=True orders by the composite score in modules/ranking.py instead
+    # of (Rating, Experience); distance_km is aligned with the directory rows.
+    # With k only the best k come back, and attrs["matches"] counts them all
+    if distance_km is None:
+        log_query("doctors", specialist=specialist, location=location, min_experience=min_experience,
+                  min_rating=min_rating, ranked=ranked)
+    if DOCTOR_BACKEND == "sqlite":
+        filtered = sqlite_store.get_doctors_by_specialist(specialist, location, min_experience, min_rating)
+        if ranked:
+            distances = None if distance_km is None else np.asarray(distance_km)[filtered.index]
+            filtered = ranking.rank_frame(filtered, distances)
+        return _top(filtered, k)
+
+    if DOCTOR_BACKEND == "sharded":
+        # Distances are aligned with global rows, so they can only be applied after the merge
+        by_distance = ranked and distance_km is not None
+        filtered = sharded_directory.get_doctors_by_specialist(
+            specialist, location, min_experience, min_rating, ranked=ranked and not by_distance,
+            k=None if by_distance else k,
+        )
+        if by_distance:
+            filtered = _top(ranking.rank_frame(filtered, np.asarray(distance_km)[filtered.index]), k)
+        return filtered
+
+    # Hold on to one snapshot for the whole query, even if a reload happens
+    filtered = filter_snapshot(get_snapshot(), specialist, location, min_experience, min_rating, ranked, distance_km)
+    return _top(filtered, k)
+
+
+def _top(filtered, k):
+    if k is None:
+        return filtered
+    top = filtered.head(k)
+    top.attrs["matches"] = len(filtered)
+    return top
+
+
+def filter_snapshot(snapshot, specialist, location=None, min_experience=0, min_rating=None,
+                    ranked=False, distance_km=None):
+    # The in-memory query against one snapshot (each directory shard runs it too)
+
+    # Specialist and (optional) location via the snapshot's indexes
     specialist = specialist.strip().lower()
+    location = location.strip().lower() if location else None
 
-    filtered = doctor_df[doctor_df['Specialist'] == specialist]
+    if ranked:
+        rows = ranking.rank_rows(snapshot, specialist, location, min_experience, min_rating, distance_km)
+        return snapshot.doctor_df.iloc[rows]
 
-    # Filter by location (optional)
-    if location:
-        filtered = filtered[filtered['Location'].str.strip().str.lower() == location.strip().lower()]
+    filtered = snapshot.doctor_df.iloc[snapshot.rows_for(specialist, location)]
 
     # Filter by experience
     filtered = filtered[filtered['Experience'] >= min_experience]
@@ -25,9 +69,25 @@ def get_doctors_by_specialist(specialist, location=None, min_experience=0, min_r
     if min_rating is not None and "Rating" in filtered.columns:
         filtered = filtered[filtered['Rating'] >= min_rating]
         # Sort by rating first, then experience
-        filtered = filtered.sort_values(by=["Rating", "Experience"], ascending=[False, False])
+        filtered = filtered.sort_values(by=["Rating", "Experience"], ascending=[False, False], kind="stable")
     else:
         # Only sort by experience if rating is missing
-        filtered = filtered.sort_values(by="Experience", ascending=False)
+        filtered = filtered.sort_values(by="Experience", ascending=False, kind="stable")
+
+    return filtered
+
+
+def get_doctors_by_specialists(specialists, location=None, min_experience=0, min_rating=None):
+    # Several specialists at once, ranked; returns {specialist: doctors_df}
+    specialists = list(dict.fromkeys(s.strip().lower() for s in specialists))
+
+    if DOCTOR_BACKEND != "memory":
+        return {
+            specialist: get_doctors_by_specialist(specialist, location, min_experience, min_rating, ranked=True)
+            for specialist in specialists
+        }
 
-    return filtered
\ No newline at end of file
+    snapshot = get_snapshot()
+    location = location.strip().lower() if location else None
+    grouped = ranking.rank_rows_grouped(snapshot, specialists, location, min_experience, min_rating)
+    return {specialist: snapshot.doctor_df.iloc[rows] for specialist, rows in grouped.items()}
@@ -1,14 +1,11 @@
 # modules/doctor_profiles.py
 
-import pandas as pd
-import os
+from modules.data_store import DOCTOR_BACKEND, get_snapshot
 
-# Get absolute path of the project root
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_PATH = os.path.join(BASE_DIR, "data", "doctor_profiles.csv")
-
-# Load doctor profiles safely
-doctor_df = pd.read_csv(DATA_PATH)
+if DOCTOR_BACKEND == "sqlite":
+    from modules import sqlite_store
 
 def get_all_doctors():
-    return doctor_df.to_dict(orient="records")
+    if DOCTOR_BACKEND == "sqlite":
+        return sqlite_store.get_all_doctors()
+    return get_snapshot().doctor_df.to_dict(orient="records")
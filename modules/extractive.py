@@ -0,0 +1,90 @@
+"""
+Fast extractive summaries, shown while the abstractive one is generated.
+
+Sentences are scored in one vectorized pass: every content word is
+weighted by its frequency in the document. A sentence's score is the
+mean weight of its words, with a small bonus for appearing early
+(reports state the presenting problem first). The best sentences are
+returned in document order, up to a word budget. This takes a few
+milliseconds even for long reports; no model is involved.
+
+time_to_first_summary and time_to_final_summary track, per request, when
+the clinician first saw a summary and when the abstractive one arrived.
+"""
+
+import re
+
+import numpy as np
+
+from modules.metrics import LatencyStats
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+WORD = re.compile(r"[a-z][a-z0-9'-]+")
+
+# Function words carry no signal about what a report is about
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his in is it its of on or
+she that the their there this to was were which with without patient patients no not
+""".split())
+
+# Earlier sentences get up to this much extra weight
+POSITION_BONUS = 0.3
+
+time_to_first_summary = LatencyStats()
+time_to_final_summary = LatencyStats()
+
+
+def split_sentences(text):
+    sentences = (" ".join(s.split()) for s in SENTENCE_SPLIT.split(text))
+    # Templated text repeats across pages; keep the first occurrence
+    return list(dict.fromkeys(s for s in sentences if len(s) > 20))
+
+
+def score_sentences(sentences):
+    """Score of every sentence (higher is more central), as a NumPy array."""
+    vocabulary = {}
+    sentence_ids, word_ids = [], []
+    for i, sentence in enumerate(sentences):
+        for word in WORD.findall(sentence.lower()):
+            if word not in STOPWORDS:
+                sentence_ids.append(i)
+                word_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+    if not word_ids:
+        return np.zeros(len(sentences))
+
+    sentence_ids = np.asarray(sentence_ids)
+    word_ids = np.asarray(word_ids)
+    frequency = np.bincount(word_ids).astype(np.float64)
+    weights = frequency / frequency.max()
+
+    totals = np.bincount(sentence_ids, weights=weights[word_ids], minlength=len(sentences))
+    lengths = np.bincount(sentence_ids, minlength=len(sentences))
+    scores = np.divide(totals, lengths, out=np.zeros(len(sentences)), where=lengths > 0)
+    position = 1.0 - np.arange(len(sentences)) / max(len(sentences), 1)
+    return scores * (1.0 + POSITION_BONUS * position)
+
+
+def extractive_summary(text, max_words=150):
+    """The highest scoring sentences, in document order, within ``max_words``."""
+    sentences = split_sentences(text)
+    if not sentences:
+        return text.strip()[:max_words * 8]
+
+    chosen = []
+    words = 0
+    for i in np.argsort(-score_sentences(sentences), kind="stable"):
+        length = len(sentences[i].split())
+        if chosen and words + length > max_words:
+            continue
+        chosen.append(i)
+        words += length
+        if words >= max_words:
+            break
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def progressive_stats():
+    return {
+        "time_to_first_summary": time_to_first_summary.summary(),
+        "time_to_final_summary": time_to_final_summary.summary(),
+    }
@@ -0,0 +1,163 @@
+"""
+Cancellation of in-flight summary generations, per user session.
+
+Each generation gets a CancelToken. The summarizer checks the token
+between decode steps through a stopping criterion, so a cancelled
+``model.generate`` stops after at most one more step instead of running
+to max_length. Starting a generation for a session cancels that
+session's older ones, because their results would be thrown away (a
+Streamlit rerun replaces the previous run's output). At most
+DOCWISE_GENERATIONS_PER_SESSION (default 1) may still be running per
+session. Cancelled generations need a step to wind down, so a new one
+waits briefly for them and is then refused with SessionBusy.
+
+Decode steps spent on generations that were later cancelled are
+counted as wasted in stats(). submit() runs a generation on a worker
+thread, so the Streamlit script thread stays free to notice a rerun or
+a closed session and cancel it.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_PER_SESSION = int(os.environ.get("DOCWISE_GENERATIONS_PER_SESSION", "1"))
+# How long a new generation waits for superseded ones to stop
+DRAIN_TIMEOUT = 5.0
+
+
+class GenerationCancelled(Exception):
+    """The generation was superseded or its session went away."""
+
+
+class SessionBusy(Exception):
+    """The session already has as many generations running as it may."""
+
+
+class CancelToken:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.steps = 0
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def step(self):
+        """Count one decode step; True once the generation should stop."""
+        self.steps += 1
+        return self._cancelled.is_set()
+
+    def raise_if_cancelled(self):
+        if self._cancelled.is_set():
+            raise GenerationCancelled(f"generation for session {self.session_id} was cancelled")
+
+
+class GenerationRegistry:
+    def __init__(self, max_per_session=MAX_PER_SESSION):
+        self.max_per_session = max_per_session
+        self._running = {}
+        self._cond = threading.Condition()
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.refused = 0
+        self.wasted_steps = 0
+        self.useful_steps = 0
+
+    def start(self, session_id, supersede=True, timeout=DRAIN_TIMEOUT):
+        """Register a new generation for ``session_id`` and return its token."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            running = self._running.setdefault(session_id, [])
+            if supersede:
+                for token in running:
+                    token.cancel()
+            while len(running) >= self.max_per_session:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.refused += 1
+                    raise SessionBusy(f"{len(running)} generations still running for this session")
+                self._cond.wait(remaining)
+            token = CancelToken(session_id)
+            running.append(token)
+            self.started += 1
+        return token
+
+    def finish(self, token):
+        """Unregister ``token`` and account its decode steps."""
+        with self._cond:
+            running = self._running.get(token.session_id, [])
+            if token in running:
+                running.remove(token)
+            if not running:
+                self._running.pop(token.session_id, None)
+            if token.cancelled:
+                self.cancelled += 1
+                self.wasted_steps += token.steps
+            else:
+                self.completed += 1
+                self.useful_steps += token.steps
+            self._cond.notify_all()
+
+    def cancel_session(self, session_id):
+        """Cancel everything running for a session; returns how many were cancelled."""
+        with self._cond:
+            running = list(self._running.get(session_id, ()))
+        for token in running:
+            token.cancel()
+        return len(running)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": sum(len(tokens) for tokens in self._running.values()),
+                "sessions": len(self._running),
+                "started": self.started,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "refused": self.refused,
+                "useful_steps": self.useful_steps,
+                "wasted_steps": self.wasted_steps,
+            }
+
+
+registry = GenerationRegistry()
+start_generation = registry.start
+finish_generation = registry.finish
+cancel_session = registry.cancel_session
+generation_stats = registry.stats
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def submit(session_id, fn, *args, **kwargs):
+    """Run ``fn(*args, cancel_token=token, **kwargs)`` on a generation thread.
+
+    Returns ``(token, future)``. The caller polls the future and cancels
+    the token if it stops waiting, e.g. when Streamlit interrupts its run.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("DOCWISE_GENERATION_THREADS", "4")),
+                thread_name_prefix="docwise-generate",
+            )
+    token = registry.start(session_id)
+
+    def run():
+        try:
+            token.raise_if_cancelled()
+            return fn(*args, cancel_token=token, **kwargs)
+        finally:
+            registry.finish(token)
+
+    return token, _executor.submit(run)
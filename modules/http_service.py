@@ -0,0 +1,410 @@
+"""
+Async HTTP/JSON service for doctor recommendations, outside Streamlit.
+
+Endpoints (JSON responses):
+    GET  /specialist?disease=...
+    GET  /doctors?disease=...&location=...&min_experience=2&min_rating=3.5&limit=20
+    GET  /suggest?field=disease|location&q=dia&limit=8
+    GET  /healthz
+    GET  /stats
+    POST /summaries?max_length=200&min_length=50   (body: the PDF) -> 202 {"job_id"}
+    GET  /summaries/<job_id>                        -> job status / summary
+
+The /summaries endpoints are only enabled with --summary-workers N; they
+hand PDFs to the persistent job queue in modules/summary_jobs.py.
+
+HTTP/1.1 keep-alive is supported, in-flight queries are capped (extra
+requests get 503 instead of piling up), SIGHUP reloads the data files
+without dropping connections, and SIGTERM/SIGINT drain in-flight
+requests before exiting. With --workers N the data is loaded once in the
+parent and N forked workers share the port (SO_REUSEPORT) and the pages.
+
+Usage: python -m modules.http_service --port 8080 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from modules.admission import memory_stats
+from modules.autocomplete import suggest_diseases, suggest_locations
+from modules.data_store import DOCTOR_BACKEND, get_snapshot, preload_for_fork, reload_if_changed
+from modules.disease_mapper import predict_specialist
+from modules.latency_scheduler import stats as latency_stats
+from modules.query_cache import QueryCache
+from modules.query_log import prewarm, stats as query_log_stats
+from modules.ranking import get_weights
+from modules.recommender import cache_stats, normalize_query, recommend_doctors
+from modules.summary_jobs import QueueFull, SummaryJobQueue
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 20 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 15.0
+SHUTDOWN_GRACE = 10.0
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def _encode(body):
+    return json.dumps(body, default=str).encode()
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _float_param(params, name, default=None):
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise HttpError(400, f"{name} must be a number")
+    if not math.isfinite(number):
+        raise HttpError(400, f"{name} must be a finite number")
+    return number
+
+
+def _int_param(params, name, default, minimum=1):
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    # Plain ASCII digits only: no signs, decimals, NaN or inf
+    if not (value.isascii() and value.isdigit()) or int(value) < minimum:
+        raise HttpError(400, f"{name} must be an integer >= {minimum}")
+    return int(value)
+
+
+class RecommendationService:
+    def __init__(self, max_concurrency=None, max_pending=256, threads=4, summary_jobs=None):
+        self.max_pending = max_pending
+        self.summary_jobs = summary_jobs
+        # A query slot is only useful with a thread to run it; beyond that
+        # queries would just queue inside the executor, uncounted
+        max_concurrency = max_concurrency or threads
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max(threads, max_concurrency),
+                                            thread_name_prefix="docwise-http")
+        self._pending = 0
+        # Encoded /doctors responses, so hot queries skip the executor entirely
+        self._responses = QueryCache(maxsize=4096, ttl=60.0)
+        self._connections = set()
+        self.requests = 0
+        self.rejected = 0
+        self.started_at = time.time()
+
+    # ---- endpoints (run on executor threads) ----
+
+    def specialist(self, params):
+        disease = params.get("disease", "").strip()
+        if not disease:
+            raise HttpError(400, "disease is required")
+        return {"disease": disease, "specialist": predict_specialist(disease)}
+
+    def _doctors_key(self, params):
+        disease = params.get("disease", "").strip()
+        if not disease:
+            raise HttpError(400, "disease is required")
+        query = normalize_query(
+            disease,
+            location=params.get("location") or None,
+            min_experience=_float_param(params, "min_experience", 0),
+            min_rating=_float_param(params, "min_rating"),
+        )
+        return (get_snapshot().version, get_weights(), _int_param(params, "limit", 20)) + query
+
+    def doctors(self, params):
+        key = self._doctors_key(params)
+        limit, query = key[2], key[3:]
+        specialist, doctors_df = recommend_doctors(*query, limit=limit)
+        doctors = [] if doctors_df is None else doctors_df.to_dict(orient="records")
+        payload = _encode({
+            "disease": query[0],
+            "specialist": specialist,
+            "count": 0 if doctors_df is None else doctors_df.attrs["matches"],
+            "doctors": doctors,
+        })
+        self._responses.put(key, payload)
+        return payload
+
+    def suggest(self, params):
+        field = params.get("field", "disease")
+        suggest = {"disease": suggest_diseases, "location": suggest_locations}.get(field)
+        if suggest is None:
+            raise HttpError(400, "field must be disease or location")
+        prefix = params.get("q", "")
+        return {"field": field, "q": prefix, "suggestions": suggest(prefix, _int_param(params, "limit", 8))}
+
+    def healthz(self, params):
+        snapshot = get_snapshot()
+        return {"status": "ok", "snapshot_version": snapshot.version, "pid": os.getpid()}
+
+    def stats(self, params):
+        return {
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "pending": self._pending,
+            "open_connections": len(self._connections),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "result_cache": cache_stats(),
+            "query_log": query_log_stats(),
+            "response_cache": self._responses.stats(),
+            "summary_jobs": self.summary_jobs.stats() if self.summary_jobs else None,
+            "memory": memory_stats() if self.summary_jobs else None,
+            "latency_budget": latency_stats() if self.summary_jobs else None,
+        }
+
+    ROUTES = {"/specialist": specialist, "/doctors": doctors, "/suggest": suggest,
+              "/healthz": healthz, "/stats": stats}
+
+    # ---- HTTP plumbing ----
+
+    async def dispatch(self, method, target, body=b""):
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        if url.path == "/summaries" or url.path.startswith("/summaries/"):
+            return await self.summaries(method, url.path, params, body)
+
+        if method != "GET":
+            raise HttpError(405, "only GET is supported")
+        handler = self.ROUTES.get(url.path)
+        if handler is None:
+            raise HttpError(404, f"no route for {url.path}")
+
+        if handler is RecommendationService.doctors:
+            payload = self._responses.get(self._doctors_key(params))
+            if payload is not None:
+                return payload
+
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HttpError(503, "server busy, retry later")
+
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, handler, self, params)
+        finally:
+            self._pending -= 1
+
+    async def summaries(self, method, path, params, body):
+        if self.summary_jobs is None:
+            raise HttpError(404, "summaries are not enabled on this server")
+        loop = asyncio.get_running_loop()
+
+        if path == "/summaries":
+            if method != "POST":
+                raise HttpError(405, "POST a PDF to /summaries")
+            if not body:
+                raise HttpError(400, "request body must be the PDF file")
+            try:
+                job_id = await loop.run_in_executor(
+                    self._executor, self.summary_jobs.submit, body,
+                    _int_param(params, "max_length", 200),
+                    _int_param(params, "min_length", 50, minimum=0),
+                )
+            except QueueFull as e:
+                raise HttpError(503, f"summary queue full: {e}")
+            return 202, {"job_id": job_id, "status": "queued"}
+
+        if method != "GET":
+            raise HttpError(405, "only GET is supported")
+        job = await loop.run_in_executor(self._executor, self.summary_jobs.status, path.split("/", 2)[2])
+        if job is None:
+            raise HttpError(404, "unknown job id")
+        return job
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "headers too large"}, keep_alive=False)
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                length = headers.get("content-length") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {"error": "invalid Content-Length"}, keep_alive=False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "request body too large"}, keep_alive=False)
+                    break
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), KEEP_ALIVE_TIMEOUT) if length else b""
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    # The client sent less than its Content-Length, or stopped sending
+                    break
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                self.requests += 1
+                try:
+                    result = await self.dispatch(method, target, body)
+                    status, response = result if isinstance(result, tuple) else (200, result)
+                except HttpError as e:
+                    status, response = e.status, {"error": str(e)}
+                except Exception as e:
+                    logger.exception("Request %s %s failed", method, target)
+                    status, response = 500, {"error": str(e)}
+
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _respond(self, writer, status, body, keep_alive):
+        payload = body if isinstance(body, bytes) else _encode(body)
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode() + payload
+        )
+        await writer.drain()
+
+    async def reload_data(self):
+        loop = asyncio.get_running_loop()
+        reloaded = await loop.run_in_executor(self._executor, lambda: reload_if_changed(force=True))
+        logger.info("SIGHUP data reload %s", "done" if reloaded else "failed")
+
+    async def drain(self):
+        deadline = time.monotonic() + SHUTDOWN_GRACE
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in list(self._connections):
+            task.cancel()
+        self._executor.shutdown(wait=False)
+
+
+async def serve(host, port, max_concurrency, max_pending, threads, reuse_port=False,
+                summary_workers=0, max_queued_summaries=32):
+    summary_jobs = None
+    if summary_workers > 0:
+        summary_jobs = SummaryJobQueue(workers=summary_workers, max_queued=max_queued_summaries)
+        if os.environ.get("DOCWISE_WARMUP", "0") == "1":
+            # Imported here so recommendation-only servers never load torch
+            from modules.summarizer import start_warmup
+            start_warmup()
+
+    service = RecommendationService(max_concurrency, max_pending, threads, summary_jobs)
+    server = await asyncio.start_server(
+        service.handle_connection, host, port,
+        limit=MAX_HEADER_BYTES, reuse_port=reuse_port or None
+    )
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(service.reload_data()))
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Serving on %s:%d (pid %d)", host, port, os.getpid())
+    async with server:
+        await stop.wait()
+        # Stop accepting, then let in-flight requests finish
+        server.close()
+        await service.drain()
+        if summary_jobs is not None:
+            summary_jobs.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DOCWISE AI doctor recommendation HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="forked worker processes")
+    parser.add_argument("--max-concurrency", type=int, default=None,
+                        help="queries run at once per worker (default: --threads)")
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=4, help="query threads per worker")
+    parser.add_argument("--summary-workers", type=int, default=0,
+                        help="summarization threads per worker (0 disables /summaries)")
+    parser.add_argument("--max-queued-summaries", type=int, default=32)
+    parser.add_argument("--no-prewarm", action="store_true",
+                        help="don't replay popular logged queries before serving")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    if DOCTOR_BACKEND == "sqlite":
+        # Build before serving rather than on the first query
+        from modules.sqlite_store import ensure_database
+        ensure_database()
+    if not args.no_prewarm:
+        # Before forking, so every worker inherits the warm caches
+        prewarm()
+
+    def run(reuse_port):
+        asyncio.run(
+            serve(args.host, args.port, args.max_concurrency, args.max_pending, args.threads, reuse_port,
+                  args.summary_workers, args.max_queued_summaries)
+        )
+
+    if args.workers <= 1:
+        run(False)
+        return
+
+    # Load once in the parent so every worker shares the same pages
+    preload_for_fork()
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            run(True)
+            os._exit(0)
+        children.append(pid)
+
+    def forward(sig, frame):
+        for pid in children:
+            os.kill(pid, sig)
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, forward)
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Incremental summarization of patient records that grow over time.
+
+A longitudinal record gets new pages appended after each visit. Instead
+of re-summarizing the whole PDF, each run keeps, per record id:
+
+    pages  a hash of every page's content stream and resources, and its
+           extracted text
+    nodes  a summary tree: level 0 summarizes SEGMENT_PAGES consecutive
+           pages, each higher level summarizes FANOUT summaries below it,
+           and the single top node is the record summary
+
+A node is identified by a hash of its children (page hashes at level
+0) plus the generation settings. A later run extracts text only for
+pages whose content hash changed. It re-summarizes only the nodes whose
+hash changed, i.e. the segments holding new or edited pages and their
+path to the root. Appending pages costs O(new pages + tree height)
+generations, however long the record already is.
+
+State lives in SQLite next to the data (DOCWISE_SUMMARY_STORE_PATH).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import PyPDF2
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+from modules import admission
+from modules.data_store import DATA_DIR
+from modules.summarizer import (
+    _checked_settings, count_pdf_pages, generation_cost_mb, get_settings, measure_generation, summarize,
+)
+
+SUMMARY_STORE_PATH = os.environ.get(
+    "DOCWISE_SUMMARY_STORE_PATH", os.path.join(DATA_DIR, "record_summaries.sqlite3")
+)
+
+SEGMENT_PAGES = 4
+FANOUT = 4
+# Summaries below the root only feed the next level up
+NODE_MAX_LENGTH = 150
+NODE_MIN_LENGTH = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    record_id TEXT NOT NULL,
+    page_no INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (record_id, page_no)
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    record_id TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (record_id, level, idx)
+);
+CREATE TABLE IF NOT EXISTS records (
+    record_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    pages INTEGER NOT NULL
+);
+"""
+
+
+def _hash_object(obj, digest, seen):
+    # Everything reachable from obj: dictionaries, arrays and stream bytes
+    if isinstance(obj, IndirectObject):
+        key = (obj.idnum, obj.generation)
+        digest.update(f"R{key}".encode())
+        if key in seen:
+            return
+        seen.add(key)
+        obj = obj.get_object()
+    if isinstance(obj, DictionaryObject):
+        for name in sorted(obj):
+            if name != "/Parent":
+                digest.update(str(name).encode())
+                _hash_object(obj.raw_get(name), digest, seen)
+        if isinstance(obj, StreamObject):
+            digest.update(obj.get_data())
+    elif isinstance(obj, ArrayObject):
+        for item in obj:
+            _hash_object(item, digest, seen)
+    else:
+        digest.update(repr(obj).encode())
+
+
+def _page_hash(page):
+    # The content stream plus the resources it draws (Form XObjects,
+    # images, fonts): a page edited inside a Form XObject keeps the same
+    # "/Fm0 Do" content stream. Still much cheaper than text extraction.
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    digest.update(contents.get_data() if contents is not None else b"")
+    if "/Resources" in page:
+        _hash_object(page.raw_get("/Resources"), digest, set())
+    return digest.hexdigest()
+
+
+def _node_hash(child_hashes, settings_key):
+    return hashlib.sha256("|".join([*child_hashes, settings_key]).encode()).hexdigest()
+
+
+class IncrementalSummarizer:
+    def __init__(self, db_path=SUMMARY_STORE_PATH, segment_pages=SEGMENT_PAGES, fanout=FANOUT):
+        self.db_path = db_path
+        self.segment_pages = segment_pages
+        self.fanout = fanout
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def read_pages(self, record_id, pdf_file):
+        """``(pages, new_pages)``: (hash, text) per page, extracting only new or changed pages."""
+        reader = PyPDF2.PdfReader(pdf_file)
+        stored_pages = {
+            page_no: (page_hash, text) for page_no, page_hash, text in self._conn().execute(
+                "SELECT page_no, hash, text FROM pages WHERE record_id = ?", (record_id,)
+            )
+        }
+        pages = []
+        new_pages = 0
+        with admission.measure_stage("extract"):
+            for page_no, page in enumerate(reader.pages):
+                page_hash = _page_hash(page)
+                stored = stored_pages.get(page_no)
+                if stored is not None and stored[0] == page_hash:
+                    pages.append(stored)
+                else:
+                    pages.append((page_hash, page.extract_text() or ""))
+                    new_pages += 1
+        return pages, new_pages
+
+    def summarize_record(self, record_id, pdf_file, tokenizer, model, max_length=200, min_length=50,
+                         settings=None, timeout=None, cancel_token=None, on_text=None,
+                         pages=None, new_pages=0):
+        """Summarize ``pdf_file`` as the latest version of ``record_id``.
+
+        Returns a dict with the summary, the full text and what was
+        reused: pages, new_pages, summarized_nodes, reused_nodes.
+        ``on_text`` is called with the full text before any generation.
+        With ``pages`` and ``new_pages`` from read_pages() the PDF is not
+        read again (``pdf_file`` may be None) and only generation memory
+        is reserved.
+        """
+        settings = {**get_settings(), **_checked_settings(settings or {})}
+        stored_nodes = {
+            (level, idx): (node_hash, summary) for level, idx, node_hash, summary in self._conn().execute(
+                "SELECT level, idx, hash, summary FROM nodes WHERE record_id = ?", (record_id,)
+            )
+        }
+
+        generate_cost = generation_cost_mb(model, settings["max_input_tokens"], settings["num_beams"])
+        if pages is None:
+            cost = count_pdf_pages(pdf_file) * admission.PAGE_COST_MB + generate_cost
+        else:
+            cost = generate_cost
+        with admission.budget.reserve(cost, timeout, cancel_token) as reservation:
+            if pages is None:
+                pages, new_pages = self.read_pages(record_id, pdf_file)
+                reservation.shrink(generate_cost)
+            if on_text is not None:
+                on_text("\n".join(text for _, text in pages))
+
+            with measure_generation(model):
+                summary, nodes, summarized = self._summarize_tree(
+                    pages, stored_nodes, tokenizer, model, max_length, min_length, settings, cancel_token
+                )
+
+        self._save(record_id, pages, nodes)
+        return {
+            "summary": summary,
+            "text": "\n".join(text for _, text in pages),
+            "pages": len(pages),
+            "new_pages": new_pages,
+            "summarized_nodes": summarized,
+            "reused_nodes": len(nodes) - summarized,
+        }
+
+    def _summarize_tree(self, pages, stored_nodes, tokenizer, model, max_length, min_length,
+                        settings, cancel_token):
+        settings_key = repr(sorted(settings.items()))
+        nodes = {}
+        summarized = 0
+
+        # Level 0: (child hashes, text to summarize) per segment of pages
+        level_inputs = [
+            ([page_hash for page_hash, _ in segment], "\n".join(text for _, text in segment))
+            for segment in (pages[i:i + self.segment_pages] for i in range(0, len(pages), self.segment_pages))
+        ]
+        level = 0
+        while True:
+            is_root = len(level_inputs) <= 1
+            lengths = (max_length, min_length) if is_root else (NODE_MAX_LENGTH, NODE_MIN_LENGTH)
+            outputs = []
+            for idx, (child_hashes, text) in enumerate(level_inputs):
+                node_hash = _node_hash(child_hashes, f"{settings_key}|{lengths}")
+                stored = stored_nodes.get((level, idx))
+                if stored is not None and stored[0] == node_hash:
+                    summary = stored[1]
+                else:
+                    summary = summarize(text, tokenizer, model, *lengths, settings, cancel_token) if text.strip() else ""
+                    summarized += 1
+                nodes[(level, idx)] = (node_hash, summary)
+                outputs.append((node_hash, summary))
+
+            if is_root:
+                return (outputs[0][1] if outputs else ""), nodes, summarized
+            level += 1
+            level_inputs = [
+                ([node_hash for node_hash, _ in group], "\n".join(summary for _, summary in group))
+                for group in (outputs[i:i + self.fanout] for i in range(0, len(outputs), self.fanout))
+            ]
+
+    def _save(self, record_id, pages, nodes):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM pages WHERE record_id = ?", (record_id,))
+            conn.executemany(
+                "INSERT INTO pages (record_id, page_no, hash, text) VALUES (?, ?, ?, ?)",
+                [(record_id, page_no, page_hash, text) for page_no, (page_hash, text) in enumerate(pages)],
+            )
+            conn.execute("DELETE FROM nodes WHERE record_id = ?", (record_id,))
+            conn.executemany(
+                "INSERT INTO nodes (record_id, level, idx, hash, summary) VALUES (?, ?, ?, ?, ?)",
+                [(record_id, level, idx, node_hash, summary)
+                 for (level, idx), (node_hash, summary) in nodes.items()],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO records (record_id, updated_at, pages) VALUES (?, ?, ?)",
+                (record_id, time.time(), len(pages)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def forget(self, record_id):
+        """Drop everything stored for a record (next run starts from scratch)."""
+        conn = self._conn()
+        for table in ("pages", "nodes", "records"):
+            conn.execute(f"DELETE FROM {table} WHERE record_id = ?", (record_id,))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IncrementalSummarizer()
+    return _store
+
+
+def read_record_pages(record_id, pdf_file):
+    """read_pages() on the shared store; see IncrementalSummarizer."""
+    return get_store().read_pages(record_id, pdf_file)
+
+
+def summarize_record(record_id, pdf_file, tokenizer, model, max_length=200, min_length=50, **kwargs):
+    """summarize_record() on the shared store; see IncrementalSummarizer."""
+    return get_store().summarize_record(record_id, pdf_file, tokenizer, model, max_length, min_length, **kwargs)
@@ -0,0 +1,194 @@
+"""Unix-socket client for the local inference daemon (modules/inference_server.py)."""
+
+import json
+import os
+import queue
+import select
+import socket
+import struct
+import tempfile
+import threading
+
+from modules.admission import AdmissionRejected
+from modules.generation_control import GenerationCancelled
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "docwise-inference.sock")
+
+# Every frame: header (version, op or status, body length), then the body
+PROTOCOL_VERSION = 2
+HEADER = struct.Struct(">BBI")
+# max_length, min_length, settings JSON length; then the JSON and the UTF-8 text
+SUMMARIZE_PARAMS = struct.Struct(">HHH")
+# The same plus a latency budget in seconds, planned by the daemon
+BUDGET_PARAMS = struct.Struct(">HHHd")
+# ST_PROGRESS body: decode steps so far
+PROGRESS = struct.Struct(">I")
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+OP_SUMMARIZE = 1
+OP_PING = 2
+OP_STATS = 3
+OP_SUMMARIZE_BUDGET = 4
+
+ST_OK = 0
+ST_ERROR = 1
+ST_BUSY = 2
+ST_PROGRESS = 3
+
+# How often a waiting client checks its cancel token
+CANCEL_POLL_SECONDS = 0.25
+
+
+class InferenceError(Exception):
+    """The daemon failed the request or could not be reached."""
+
+
+class ConnectionClosed(Exception):
+    pass
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionClosed("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_frame(sock, op, body=b""):
+    sock.sendall(HEADER.pack(PROTOCOL_VERSION, op, len(body)) + body)
+
+
+def recv_frame(sock):
+    version, op, length = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if version != PROTOCOL_VERSION:
+        raise InferenceError(f"protocol version {version}, expected {PROTOCOL_VERSION}")
+    if length > MAX_BODY_BYTES:
+        raise InferenceError(f"frame of {length} bytes is too large")
+    return op, _recv_exact(sock, length)
+
+
+def encode_summarize(text, max_length, min_length, settings=None, latency_budget=None):
+    settings_json = json.dumps(settings).encode() if settings else b""
+    if latency_budget is None:
+        params = SUMMARIZE_PARAMS.pack(max_length, min_length, len(settings_json))
+    else:
+        params = BUDGET_PARAMS.pack(max_length, min_length, len(settings_json), latency_budget)
+    return params + settings_json + text.encode()
+
+
+def decode_summarize(body, with_budget=False):
+    """``(text, max_length, min_length, settings, latency_budget)`` of a request body."""
+    params = BUDGET_PARAMS if with_budget else SUMMARIZE_PARAMS
+    max_length, min_length, settings_len, *budget = params.unpack_from(body)
+    start = params.size
+    settings = json.loads(body[start:start + settings_len]) if settings_len else None
+    return body[start + settings_len:].decode(), max_length, min_length, settings, (budget or [None])[0]
+
+
+class InferenceClient:
+    def __init__(self, path=DEFAULT_SOCKET_PATH, pool_size=4, timeout=600):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise InferenceError(f"inference daemon not reachable at {self.path}: {e}") from e
+        return sock
+
+    def _release(self, sock):
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def _wait_readable(self, sock, cancel_token):
+        while not select.select([sock], [], [], CANCEL_POLL_SECONDS)[0]:
+            if cancel_token.cancelled:
+                # Hanging up is the cancel signal; the daemon stops generating
+                sock.close()
+                raise GenerationCancelled("generation was cancelled")
+
+    def call(self, op, body=b"", cancel_token=None):
+        """Send one request and return ``(status, body)``."""
+        # A pooled connection may have been closed by a daemon restart; in
+        # that case retry once on a fresh one
+        for attempt in range(2):
+            try:
+                sock, pooled = self._pool.get_nowait(), True
+            except queue.Empty:
+                sock, pooled = self._connect(), False
+            try:
+                send_frame(sock, op, body)
+                while True:
+                    if cancel_token is not None:
+                        self._wait_readable(sock, cancel_token)
+                    status, response = recv_frame(sock)
+                    if status != ST_PROGRESS:
+                        break
+                    if cancel_token is not None:
+                        # The decode steps run in the daemon; mirror its count
+                        cancel_token.steps = PROGRESS.unpack(response)[0]
+            except (ConnectionClosed, BrokenPipeError, ConnectionResetError) as e:
+                sock.close()
+                if pooled and attempt == 0:
+                    continue
+                raise InferenceError(f"inference daemon closed the connection: {e}") from e
+            except BaseException:
+                sock.close()
+                raise
+            self._release(sock)
+            return status, response
+
+    def summarize(self, text, max_length=200, min_length=50, settings=None, cancel_token=None):
+        status, body = self.call(OP_SUMMARIZE, encode_summarize(text, max_length, min_length, settings), cancel_token)
+        return _checked(status, body).decode()
+
+    def summarize_within_budget(self, text, latency_budget, max_length=200, min_length=50, settings=None,
+                                cancel_token=None):
+        """Summarize with settings the daemon plans for ``latency_budget``; returns (summary, plan)."""
+        body = encode_summarize(text, max_length, min_length, settings, latency_budget)
+        response = json.loads(_checked(*self.call(OP_SUMMARIZE_BUDGET, body, cancel_token)))
+        return response["summary"], response["plan"]
+
+    def ping(self):
+        return self.call(OP_PING)[1].decode()
+
+    def stats(self):
+        return json.loads(self.call(OP_STATS)[1])
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _checked(status, body):
+    if status == ST_OK:
+        return body
+    if status == ST_BUSY:
+        raise AdmissionRejected(body.decode())
+    raise InferenceError(body.decode())
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(path):
+    """Shared, pooled client for ``path`` (one per process)."""
+    with _clients_lock:
+        if path not in _clients:
+            _clients[path] = InferenceClient(path, pool_size=int(os.environ.get("DOCWISE_INFERENCE_POOL", "4")))
+        return _clients[path]
@@ -0,0 +1,226 @@
+"""
+Local inference daemon: one process per host owns the BART model and
+serves summaries over a Unix domain socket (protocol in
+modules/inference_client.py).
+
+Any number of Streamlit replicas or HTTP workers started with
+DOCWISE_INFERENCE_SOCKET pointing at the socket send their text here
+instead of loading the model. Model memory is paid once per host, and
+generate() CPU scales with load rather than replica count. Each
+connection gets a thread; at most --concurrency generations run at once
+and the rest wait. A request that doesn't fit the memory budget right
+now gets ST_BUSY at once (no queueing for memory), which clients raise
+as AdmissionRejected. A malformed request gets ST_ERROR. A client hanging up
+mid-request cancels its generation at the next decode step.
+
+Requests with a latency budget (OP_SUMMARIZE_BUDGET) are planned here,
+by modules/latency_scheduler.py. The daemon owns the model, so its cost
+model is fitted to its own generations. It is calibrated at startup,
+and the budget counts from the request's arrival.
+
+Usage: python -m modules.inference_server --socket /run/docwise/inference.sock --concurrency 2
+"""
+
+import argparse
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+from modules import admission, latency_scheduler
+from modules.generation_control import CancelToken, GenerationCancelled
+from modules.inference_client import (
+    DEFAULT_SOCKET_PATH, OP_PING, OP_STATS, OP_SUMMARIZE, OP_SUMMARIZE_BUDGET, PROGRESS, ST_BUSY, ST_ERROR,
+    ST_OK, ST_PROGRESS, ConnectionClosed, InferenceError, decode_summarize, recv_frame, send_frame,
+)
+from modules.metrics import LatencyStats
+from modules.summarizer import (
+    MODEL_NAME, _checked_settings, calibrate_latency, estimate_tokens, get_settings, load_local_model,
+    summarize, summarize_within_budget,
+)
+
+# Seconds a request may wait for memory before the client is told ST_BUSY
+ADMISSION_TIMEOUT = float(os.environ.get("DOCWISE_INFERENCE_ADMISSION_TIMEOUT", "0"))
+
+logger = logging.getLogger(__name__)
+
+
+def _hung_up(sock):
+    # Readable with nothing to read means the peer closed its end
+    if not select.select([sock], [], [], 0)[0]:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+
+
+class _ConnectionToken(CancelToken):
+    """Reports each decode step to the client; cancelled as soon as it disconnects."""
+
+    def __init__(self, sock):
+        super().__init__("inference")
+        self.sock = sock
+
+    def step(self):
+        if not self.cancelled:
+            try:
+                if _hung_up(self.sock):
+                    self.cancel()
+                else:
+                    send_frame(self.sock, ST_PROGRESS, PROGRESS.pack(self.steps + 1))
+            except OSError:
+                self.cancel()
+        return super().step()
+
+
+class InferenceStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.busy = 0
+        self.cancelled = 0
+        self.active = 0
+        self.latency = LatencyStats()
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "busy": self.busy,
+            "cancelled": self.cancelled,
+            "active": self.active,
+            "seconds": self.latency.summary(),
+        }
+
+
+class InferenceHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                op, body = recv_frame(self.request)
+            except (ConnectionClosed, ConnectionResetError):
+                return
+            except InferenceError as e:
+                # Bad version or oversized frame: the stream can't be resynced, so answer and hang up
+                try:
+                    send_frame(self.request, ST_ERROR, str(e).encode())
+                except OSError:
+                    pass
+                return
+            if op in (OP_SUMMARIZE, OP_SUMMARIZE_BUDGET):
+                status, response = self.summarize(body, op == OP_SUMMARIZE_BUDGET)
+            elif op == OP_PING:
+                status, response = ST_OK, MODEL_NAME.encode()
+            elif op == OP_STATS:
+                status, response = ST_OK, json.dumps({
+                    "inference": server.stats.summary(),
+                    "memory": admission.memory_stats(),
+                    "latency_budget": latency_scheduler.stats(),
+                }).encode()
+            else:
+                status, response = ST_ERROR, f"unknown op {op}".encode()
+            if status is None:
+                return  # cancelled: the client is gone
+            try:
+                send_frame(self.request, status, response)
+            except OSError:
+                return
+
+    def summarize(self, body, with_budget=False):
+        server = self.server
+        stats = server.stats
+        stats.count("requests")
+        started = time.perf_counter()
+        try:
+            text, max_length, min_length, settings, latency_budget = decode_summarize(body, with_budget)
+            settings = {**get_settings(), **_checked_settings(settings or {})}
+            tokens = min(estimate_tokens(text), settings["max_input_tokens"])
+            cost = admission.estimate_cost_mb(0, tokens, settings["num_beams"])
+            # A slot first: memory is only held by requests that are about to generate
+            with server.slots, admission.budget.reserve(cost, ADMISSION_TIMEOUT):
+                with stats.lock:
+                    stats.active += 1
+                try:
+                    with admission.measure_stage("generate"):
+                        if latency_budget is None:
+                            response = summarize(text, server.tokenizer, server.model, max_length, min_length,
+                                                 settings, _ConnectionToken(self.request)).encode()
+                        else:
+                            # Waiting for a slot used part of the budget
+                            remaining = max(latency_budget - (time.perf_counter() - started), 0.0)
+                            summary, plan = summarize_within_budget(
+                                text, server.tokenizer, server.model, remaining, max_length, min_length,
+                                settings, _ConnectionToken(self.request),
+                            )
+                            response = json.dumps({"summary": summary, "plan": plan}).encode()
+                finally:
+                    with stats.lock:
+                        stats.active -= 1
+        except admission.AdmissionRejected as e:
+            stats.count("busy")
+            return ST_BUSY, str(e).encode()
+        except GenerationCancelled:
+            stats.count("cancelled")
+            return None, None
+        except Exception as e:
+            stats.count("errors")
+            logger.exception("Summarization failed")
+            return ST_ERROR, str(e).encode()
+        stats.latency.record(time.perf_counter() - started)
+        return ST_OK, response
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, concurrency):
+        self.tokenizer, self.model = load_local_model()
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.stats = InferenceStats()
+        if os.path.exists(path):
+            os.unlink(path)  # left over from a previous run
+        super().__init__(path, InferenceHandler)
+        # Replicas may run as other users of the same group
+        os.chmod(path, 0o660)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DOCWISE AI local inference daemon")
+    parser.add_argument("--socket", default=os.environ.get("DOCWISE_INFERENCE_SOCKET") or DEFAULT_SOCKET_PATH)
+    parser.add_argument("--concurrency", type=int, default=1, help="generations run at the same time")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    server = InferenceServer(args.socket, args.concurrency)
+    # Fit the latency cost model while already serving
+    threading.Thread(target=calibrate_latency, args=(server.tokenizer, server.model),
+                     name="docwise-calibrate", daemon=True).start()
+    # SIGTERM behaves like Ctrl-C: stop serving and remove the socket
+    signal.signal(signal.SIGTERM, lambda sig, frame: threading.Thread(target=server.shutdown).start())
+    logger.info("Serving %s on %s (pid %d)", MODEL_NAME, args.socket, os.getpid())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Latency-budget scheduling for summaries.
+
+Callers have different deadlines: an ER physician wants a summary in a
+few seconds, a nightly back-fill has none. Given a budget in seconds,
+the scheduler predicts how long generation will take on this host and
+picks the best settings that fit. The prediction comes from a cost model:
+
+    seconds = overhead
+            + encode * input_tokens
+            + beams * output_tokens * (decode + cross * input_tokens)
+
+The coefficients start from rough CPU figures for bart-large-cnn. They
+are fitted by non-negative least squares to calibration runs
+(summarizer.calibrate_latency) and refitted after every generation, so
+they follow the host the process actually runs on. Replicas that use the
+inference daemon leave planning to it: only the daemon's own generations
+show what the settings cost where the model runs.
+
+Quality is given up in this order until the prediction fits: fewer
+beams, then a smaller input window, then a shorter summary. When the
+report is longer than the window, the chunking strategy becomes dedupe
+if that removes enough boilerplate, otherwise head_tail (which keeps the
+conclusions). If even the cheapest plan is predicted to miss the budget,
+it runs anyway and counts as planned over budget. Every budgeted request
+records its predicted and actual time (stats()).
+"""
+
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+from modules.metrics import LatencyStats
+
+# Seconds: overhead, per input token, per beam-step, per beam-step per input token
+COEFFICIENT_NAMES = ("overhead", "encode_per_token", "decode_per_beam_step", "cross_per_beam_step_token")
+DEFAULT_COEFFICIENTS = (0.05, 4e-4, 2e-2, 1e-5)
+
+# Candidate settings, best first; the caller's own settings are the upper bound
+BEAM_CHOICES = (4, 2, 1)
+INPUT_CHOICES = (1024, 768, 512, 384, 256)
+OUTPUT_CHOICES = (200, 150, 100, 60, 30)
+
+# Aim below the budget: the model predicts typical time, not the worst case
+SAFETY = 0.85
+
+# Use the dedupe strategy when it removes at least this share of the words
+DEDUPE_MIN_SAVING = 0.1
+
+# Generations kept for refitting the cost model
+OBSERVATION_WINDOW = 256
+
+logger = logging.getLogger(__name__)
+
+
+def _features(input_tokens, beams, output_tokens):
+    return (1.0, float(input_tokens), float(beams * output_tokens), float(beams * output_tokens * input_tokens))
+
+
+def _nnls(x, y):
+    """Least squares with every coefficient >= 0.
+
+    A cost can't be negative, but noise can make a small term come out
+    that way. With four terms, solving on every subset of them and keeping
+    the best feasible fit is exact and needs no iterative solver.
+    """
+    terms = x.shape[1]
+    best, best_residual = np.zeros(terms), float(y @ y)
+    for mask in range(1, 2 ** terms):
+        subset = [i for i in range(terms) if mask >> i & 1]
+        solution, *_ = np.linalg.lstsq(x[:, subset], y, rcond=None)
+        if (solution < 0).any():
+            continue
+        residual = float(np.sum((x[:, subset] @ solution - y) ** 2))
+        if residual < best_residual:
+            best, best_residual = np.zeros(terms), residual
+            best[subset] = solution
+    return best
+
+
+def _choices(candidates, requested):
+    # The requested value first, then every smaller candidate
+    return [requested] + [c for c in candidates if c < requested]
+
+
+class CostModel:
+    """Predicted generation seconds, fitted to measured generations."""
+
+    def __init__(self, coefficients=DEFAULT_COEFFICIENTS, window=OBSERVATION_WINDOW):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.fitted = False
+        self._observations = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def predict(self, input_tokens, beams, output_tokens):
+        return float(np.dot(self.coefficients, _features(input_tokens, beams, output_tokens)))
+
+    def observe(self, input_tokens, beams, output_tokens, seconds):
+        """Record one generation and refit."""
+        with self._lock:
+            self._observations.append(_features(input_tokens, beams, output_tokens) + (seconds,))
+            self._fit()
+
+    def _fit(self):
+        data = np.asarray(self._observations)
+        x, y = data[:, :-1], data[:, -1]
+        # Until the settings seen vary enough to pin every term, keep the current figures
+        if np.linalg.matrix_rank(x) < x.shape[1]:
+            return
+        self.coefficients = _nnls(x, y)
+        self.fitted = True
+
+    def summary(self):
+        return {
+            "fitted": self.fitted,
+            "observations": len(self._observations),
+            **dict(zip(COEFFICIENT_NAMES, self.coefficients.tolist())),
+        }
+
+
+class LatencyScheduler:
+    def __init__(self, cost_model=None):
+        self.cost = cost_model or CostModel()
+        self.requests = 0
+        self.planned_over_budget = 0
+        self.missed_budget = 0
+        self.actual = LatencyStats()
+        self.error = LatencyStats()
+        self._recent = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def _chunking(self, window, strategy, document_tokens, deduped_tokens):
+        """Input strategy and the number of tokens the model will read."""
+        if document_tokens > window:
+            if document_tokens - deduped_tokens >= DEDUPE_MIN_SAVING * document_tokens:
+                strategy = "dedupe"
+            else:
+                strategy = "head_tail"
+        tokens = deduped_tokens if strategy == "dedupe" else document_tokens
+        return strategy, min(tokens, window)
+
+    def plan(self, latency_budget, settings, document_tokens, deduped_tokens=None, max_length=200, min_length=50):
+        """Settings predicted to finish within ``latency_budget`` seconds.
+
+        ``settings`` (a full summarizer settings dict) caps beams and
+        input window. ``document_tokens`` is the estimated length of the
+        text (summarizer.estimate_tokens) and ``deduped_tokens`` its
+        length with repeated sentences removed.
+        Returns a dict with the generation arguments and the prediction.
+        """
+        if deduped_tokens is None:
+            deduped_tokens = document_tokens
+
+        best = None
+        seen = set()
+        for output in _choices(OUTPUT_CHOICES, max_length):
+            for window in _choices(INPUT_CHOICES, settings["max_input_tokens"]):
+                strategy, input_tokens = self._chunking(window, settings["input_strategy"],
+                                                        document_tokens, deduped_tokens)
+                if (output, input_tokens, strategy) in seen:
+                    continue  # the report already fits a larger window
+                seen.add((output, input_tokens, strategy))
+                for beams in _choices(BEAM_CHOICES, settings["num_beams"]):
+                    candidate = {
+                        "latency_budget": latency_budget,
+                        "predicted_seconds": self.cost.predict(input_tokens, beams, output),
+                        "input_tokens": input_tokens,
+                        "max_length": output,
+                        "min_length": min(min_length, output),
+                        "settings": {**settings, "num_beams": beams, "max_input_tokens": window,
+                                     "input_strategy": strategy},
+                    }
+                    if candidate["predicted_seconds"] <= SAFETY * latency_budget:
+                        return {**candidate, "fits": True}
+                    if best is None or candidate["predicted_seconds"] < best["predicted_seconds"]:
+                        best = candidate
+        return {**best, "fits": False}
+
+    def report(self, plan, actual_seconds):
+        """Record how long a planned request really took."""
+        plan["actual_seconds"] = actual_seconds
+        with self._lock:
+            self.requests += 1
+            if not plan["fits"]:
+                self.planned_over_budget += 1
+            if actual_seconds > plan["latency_budget"]:
+                self.missed_budget += 1
+            self._recent.append({
+                "latency_budget": plan["latency_budget"],
+                "predicted_seconds": round(plan["predicted_seconds"], 3),
+                "actual_seconds": round(actual_seconds, 3),
+                "num_beams": plan["settings"]["num_beams"],
+                "input_tokens": plan["input_tokens"],
+                "input_strategy": plan["settings"]["input_strategy"],
+                "max_length": plan["max_length"],
+            })
+        self.actual.record(actual_seconds)
+        self.error.record(abs(actual_seconds - plan["predicted_seconds"]))
+        logger.info(
+            "Summary budget %.1fs: predicted %.2fs, took %.2fs (beams=%d, input=%d tokens %s, max_length=%d)",
+            plan["latency_budget"], plan["predicted_seconds"], actual_seconds, plan["settings"]["num_beams"],
+            plan["input_tokens"], plan["settings"]["input_strategy"], plan["max_length"],
+        )
+
+    def stats(self):
+        with self._lock:
+            recent = list(self._recent)
+        return {
+            "requests": self.requests,
+            "planned_over_budget": self.planned_over_budget,
+            "missed_budget": self.missed_budget,
+            "actual_seconds": self.actual.summary(),
+            "abs_error_seconds": self.error.summary(),
+            "cost_model": self.cost.summary(),
+            "recent": recent,
+        }
+
+
+scheduler = LatencyScheduler()
+plan = scheduler.plan
+report = scheduler.report
+observe = scheduler.cost.observe
+stats = scheduler.stats
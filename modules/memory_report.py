@@ -0,0 +1,86 @@
+"""
+Per-process memory report: how much of each worker is really its own.
+
+RSS counts shared pages (memory-mapped model weights, copy-on-write data
+inherited from a parent) once per process, so it overstates the cost of
+adding a worker. USS (private pages) is what a worker actually adds;
+PSS splits shared pages evenly between the processes mapping them.
+Linux only (reads /proc/<pid>/smaps_rollup).
+
+Usage:
+    python -m modules.memory_report                 # every streamlit/docwise process
+    python -m modules.memory_report --match streamlit
+    python -m modules.memory_report 1234 5678
+"""
+
+import argparse
+import os
+
+DEFAULT_MATCH = ["streamlit", "modules.http_service", "modules.inference_server"]
+
+
+def process_memory(pid):
+    """Return RSS, PSS, USS and shared memory of ``pid`` in KiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": uss,
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+def _cmdline(pid):
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+
+
+def find_processes(patterns):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            cmdline = _cmdline(entry)
+        except OSError:
+            continue
+        if any(pattern in cmdline for pattern in patterns):
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Unique vs shared memory per process")
+    parser.add_argument("pids", nargs="*", type=int)
+    parser.add_argument("--match", action="append", help="substring of the process command line")
+    args = parser.parse_args(argv)
+
+    pids = args.pids or find_processes(args.match or DEFAULT_MATCH)
+    totals = {"rss": 0, "pss": 0, "uss": 0}
+    print(f"{'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9} {'shared MB':>10}  command")
+    for pid in pids:
+        try:
+            mem = process_memory(pid)
+            cmdline = _cmdline(pid)
+        except OSError:
+            continue
+        for key in totals:
+            totals[key] += mem[key]
+        print(f"{pid:>8} {mem['rss'] / 1024:>9.1f} {mem['pss'] / 1024:>9.1f} "
+              f"{mem['uss'] / 1024:>9.1f} {mem['shared'] / 1024:>10.1f}  {cmdline[:60]}")
+
+    print(f"{'total':>8} {totals['rss'] / 1024:>9.1f} {totals['pss'] / 1024:>9.1f} {totals['uss'] / 1024:>9.1f}")
+    if totals["pss"]:
+        # With sharing working, summed RSS is well above what the host really uses (PSS)
+        print(f"RSS overcount from sharing: {(totals['rss'] - totals['pss']) / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
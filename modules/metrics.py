@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """Running count/mean plus percentiles over the most recent samples (seconds)."""
+
+    def __init__(self, window=10000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        return _percentile(samples, pct)
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": _percentile(samples, 50),
+            "p95": _percentile(samples, 95),
+            "p99": _percentile(samples, 99),
+            "max": samples[-1] if samples else 0.0,
+        }
+
+
+def _percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
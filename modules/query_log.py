@@ -0,0 +1,176 @@
+"""Non-blocking, sampled log of patient searches, replayed by prewarm() to warm the caches."""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from modules.data_store import DATA_DIR
+
+QUERY_LOG_PATH = os.environ.get("DOCWISE_QUERY_LOG_PATH", os.path.join(DATA_DIR, "logs", "queries.jsonl"))
+# Fraction of queries logged; off by default
+SAMPLE_RATE = float(os.environ.get("DOCWISE_QUERY_LOG_SAMPLE", "0"))
+MAX_BYTES = int(os.environ.get("DOCWISE_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+BACKUP_COUNT = 5
+QUEUE_SIZE = 10000
+
+# Prewarming: how far back to look and how many distinct queries to replay
+PREWARM_WINDOW = float(os.environ.get("DOCWISE_PREWARM_WINDOW", str(7 * 24 * 3600)))
+PREWARM_QUERIES = int(os.environ.get("DOCWISE_PREWARM_QUERIES", "200"))
+
+logger = logging.getLogger(__name__)
+
+_query_logger = logging.getLogger("docwise.queries")
+_query_logger.propagate = False
+_query_logger.setLevel(logging.INFO)
+
+_listener = None
+_listener_lock = threading.Lock()
+_local = threading.local()
+dropped = 0
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record):
+        global dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped += 1
+
+    def prepare(self, record):
+        # The message is already a JSON string; skip QueueHandler's formatting copy
+        return record
+
+
+def _start():
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            os.makedirs(os.path.dirname(QUERY_LOG_PATH), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                QUERY_LOG_PATH, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+            )
+            file_handler.setFormatter(logging.Formatter("%(message)s"))
+            log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+            _query_logger.addHandler(_DroppingQueueHandler(log_queue))
+            _listener = logging.handlers.QueueListener(log_queue, file_handler)
+            _listener.start()
+
+
+def stop():
+    """Flush pending records and stop the writer thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in list(_query_logger.handlers):
+                _query_logger.removeHandler(handler)
+            _listener = None
+
+
+def _after_fork():
+    # The writer thread doesn't survive fork(); the child starts its own
+    global _listener, _listener_lock
+    _listener_lock = threading.Lock()
+    _listener = None
+    for handler in list(_query_logger.handlers):
+        _query_logger.removeHandler(handler)
+
+
+atexit.register(stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def disable():
+    """Stop logging queries in this process, whatever DOCWISE_QUERY_LOG_SAMPLE says."""
+    global SAMPLE_RATE
+    SAMPLE_RATE = 0.0
+
+
+def _plain(value):
+    # NumPy scalars from DataFrame-driven callers
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def log_query(kind, **params):
+    """Log one query (sampled, non-blocking) unless a caller already logged it."""
+    if SAMPLE_RATE <= 0 or getattr(_local, "depth", 0) or random.random() >= SAMPLE_RATE:
+        return
+    if _listener is None:
+        _start()
+    _query_logger.info(json.dumps({"ts": round(time.time(), 3), "kind": kind, "params": params}, default=_plain))
+
+
+@contextmanager
+def query_scope(kind=None, **params):
+    """Log ``kind`` (if given) and silence the nested calls it makes."""
+    if kind is not None:
+        log_query(kind, **params)
+    _local.depth = getattr(_local, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+
+
+def popular_queries(limit=PREWARM_QUERIES, window=PREWARM_WINDOW, path=QUERY_LOG_PATH):
+    """Most frequent recent ``(kind, params)`` from the log, most popular first."""
+    since = time.time() - window
+    counts = Counter()
+    paths = [path] + [f"{path}.{i}" for i in range(1, BACKUP_COUNT + 1)]
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash or a rotation race
+                if entry.get("ts", 0) >= since:
+                    counts[(entry["kind"], json.dumps(entry["params"], sort_keys=True))] += 1
+    return [(kind, json.loads(params), count) for (kind, params), count in counts.most_common(limit)]
+
+
+def prewarm(limit=PREWARM_QUERIES, window=PREWARM_WINDOW):
+    """Replay the most popular recent queries; returns how many were replayed."""
+    from modules.disease_mapper import predict_specialist
+    from modules.doctor_filtering import get_doctors_by_specialist
+    from modules.recommender import recommend_doctors, recommend_for_conditions
+
+    replay = {
+        "recommend": recommend_doctors,
+        "conditions": recommend_for_conditions,
+        "specialist": predict_specialist,
+        "doctors": get_doctors_by_specialist,
+    }
+    started = time.perf_counter()
+    replayed = 0
+    with query_scope():
+        for kind, params, _ in popular_queries(limit, window):
+            try:
+                replay[kind](**params)
+                replayed += 1
+            except Exception:
+                logger.warning("Could not replay %s query %r", kind, params, exc_info=True)
+    logger.info("Prewarmed %d queries in %.2fs", replayed, time.perf_counter() - started)
+    return replayed
+
+
+def stats():
+    return {
+        "enabled": SAMPLE_RATE > 0,
+        "sample_rate": SAMPLE_RATE,
+        "path": QUERY_LOG_PATH,
+        "pending": _listener.queue.qsize() if _listener is not None else 0,
+        "dropped": dropped,
+    }
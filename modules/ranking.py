@@ -0,0 +1,167 @@
+"""
+Composite ranking of doctors: a weighted score over rating, experience
+and (when the caller knows it) distance, evaluated with NumPy.
+
+Rating and experience don't depend on the query, so their weighted sum
+is computed once per (data snapshot, weights) and each specialist's rows
+are stored pre-sorted by it. A query then only filters that ordered list
+(location, thresholds); a re-sort is needed only when distances are
+passed in. Weights come from DOCWISE_RANKING_WEIGHTS
+("rating=0.7,experience=0.3,distance=0.5") or set_weights(); changing
+them rebuilds the index once, not per query.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from modules.data_store import NO_ROWS, add_reload_listener, get_snapshot
+
+MAX_RATING = 5.0
+# Experience beyond this many years adds nothing to the score
+EXPERIENCE_CAP = 40.0
+
+DEFAULT_WEIGHTS = {"rating": 0.7, "experience": 0.3, "distance": 0.5}
+
+
+def parse_weights(spec):
+    """Parse "rating=0.7,experience=0.3" into a full weights dict."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        if name.strip() not in weights:
+            raise ValueError(f"Unknown ranking weight {name!r}")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+_weights = parse_weights(os.environ.get("DOCWISE_RANKING_WEIGHTS", ""))
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_weights():
+    """Current weights as a hashable, ordered tuple of (name, value)."""
+    return tuple(sorted(_weights.items()))
+
+
+def set_weights(**weights):
+    """Change ranking weights and rebuild the static index right away."""
+    global _weights
+    new_weights = dict(_weights)
+    for name, value in weights.items():
+        if name not in new_weights:
+            raise ValueError(f"Unknown ranking weight {name!r}")
+        new_weights[name] = float(value)
+    _weights = new_weights
+    _rebuild(get_snapshot())
+
+
+def static_scores(rating, experience, weights):
+    """Query-independent part of the score for arrays of ratings/experience."""
+    rating = np.nan_to_num(np.asarray(rating, dtype=np.float64), nan=0.0)
+    experience = np.minimum(np.asarray(experience, dtype=np.float64), EXPERIENCE_CAP)
+    return weights["rating"] * (rating / MAX_RATING) + weights["experience"] * (experience / EXPERIENCE_CAP)
+
+
+class RankingIndex:
+    """Per-specialist row positions, best static score first, for one snapshot."""
+
+    def __init__(self, snapshot, weights):
+        self.version = snapshot.version
+        self.weights = tuple(sorted(weights.items()))
+        doctor_df = snapshot.doctor_df
+        self.scores = static_scores(doctor_df["Rating"].to_numpy(), doctor_df["Experience"].to_numpy(), weights)
+        self.experience = doctor_df["Experience"].to_numpy()
+        self.rating = np.nan_to_num(doctor_df["Rating"].to_numpy(dtype=np.float64), nan=-np.inf)
+
+        self.ranked_rows = {}
+        for specialist, rows in snapshot.specialist_rows.items():
+            order = np.argsort(-self.scores[rows], kind="stable")
+            self.ranked_rows[specialist] = rows[order]
+
+
+def _rebuild(snapshot):
+    global _index
+    index = RankingIndex(snapshot, _weights)
+    with _index_lock:
+        _index = index
+    return index
+
+
+def get_index(snapshot):
+    """Ranking index for ``snapshot`` under the current weights."""
+    index = _index
+    if index is None or index.version != snapshot.version or index.weights != get_weights():
+        index = _rebuild(snapshot)
+    return index
+
+
+def rank_rows(snapshot, specialist, location=None, min_experience=0, min_rating=None, distance_km=None):
+    """Positions in ``snapshot.doctor_df`` matching the filters, best first.
+
+    ``distance_km`` is an optional array aligned with doctor_df rows
+    (NaN where unknown); nearer doctors score higher.
+    """
+    index = get_index(snapshot)
+    rows = index.ranked_rows.get(specialist)
+    if rows is None:
+        return NO_ROWS
+
+    if location:
+        code = snapshot.location_code_by_key.get(location, -1)
+        rows = rows[snapshot.location_codes[rows] == code]
+
+    mask = index.experience[rows] >= min_experience
+    if min_rating is not None:
+        mask &= index.rating[rows] >= min_rating
+    rows = rows[mask]
+
+    weight = dict(index.weights)["distance"]
+    if distance_km is not None and weight and len(rows):
+        distance = np.asarray(distance_km, dtype=np.float64)[rows]
+        farthest = np.nanmax(distance) if np.isfinite(distance).any() else 0.0
+        # Unknown distances count as the farthest seen
+        distance = np.nan_to_num(distance, nan=farthest)
+        penalty = distance / farthest if farthest > 0 else np.zeros_like(distance)
+        rows = rows[np.argsort(-(index.scores[rows] - weight * penalty), kind="stable")]
+    return rows
+
+
+def rank_rows_grouped(snapshot, specialists, location=None, min_experience=0, min_rating=None):
+    """rank_rows for several specialists in one filtering pass.
+
+    Returns ``{specialist: rows}``, each best first.
+    """
+    index = get_index(snapshot)
+    parts = [index.ranked_rows.get(specialist, NO_ROWS) for specialist in specialists]
+    if not parts:
+        return {}
+    rows = np.concatenate(parts)
+    groups = np.repeat(np.arange(len(parts)), [len(part) for part in parts])
+
+    mask = index.experience[rows] >= min_experience
+    if min_rating is not None:
+        mask &= index.rating[rows] >= min_rating
+    if location:
+        mask &= snapshot.location_codes[rows] == snapshot.location_code_by_key.get(location, -1)
+    # Boolean masking keeps each specialist's best-first order
+    rows, groups = rows[mask], groups[mask]
+    return {specialist: rows[groups == i] for i, specialist in enumerate(specialists)}
+
+
+def rank_frame(doctors_df, distance_km=None):
+    """Sort an already-filtered frame by composite score (for non-memory backends)."""
+    weights = dict(get_weights())
+    scores = static_scores(doctors_df["Rating"].to_numpy(), doctors_df["Experience"].to_numpy(), weights)
+    if distance_km is not None and weights["distance"]:
+        distance = np.asarray(distance_km, dtype=np.float64)
+        farthest = np.nanmax(distance) if np.isfinite(distance).any() else 0.0
+        if farthest > 0:
+            scores = scores - weights["distance"] * np.nan_to_num(distance, nan=farthest) / farthest
+    return doctors_df.iloc[np.argsort(-scores, kind="stable")]
+
+
+# Rebuild off the request path whenever new data goes live
+add_reload_listener(lambda old_snapshot, new_snapshot: _rebuild(new_snapshot))
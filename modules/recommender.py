@@ -0,0 +1,121 @@
+import os
+import re
+
+import pandas as pd
+
+from modules.data_store import add_reload_listener, get_snapshot
+from modules.disease_mapper import predict_specialist
+from modules.doctor_filtering import get_doctors_by_specialist, get_doctors_by_specialists
+from modules.query_cache import QueryCache
+from modules.query_log import log_query, query_scope
+from modules.ranking import get_weights, rank_frame
+
+# Separators between conditions in free text ("diabetes, anemia and asthma")
+CONDITION_SEPARATORS = re.compile(r"\s*(?:[,;\n]|\band\b|&)\s*", re.IGNORECASE)
+
+# Results for the most common (disease, location, thresholds) queries
+result_cache = QueryCache(
+    maxsize=int(os.environ.get("DOCWISE_RESULT_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("DOCWISE_RESULT_CACHE_TTL", "300")),
+)
+
+
+def normalize_query(disease, location=None, min_experience=0, min_rating=None):
+    disease = disease.strip().lower()
+    location = location.strip().lower() if location and location.strip() else None
+    return disease, location, min_experience, min_rating
+
+
+def recommend_doctors(disease, location=None, min_experience=0, min_rating=None, limit=None):
+    """Return ``(specialist, doctors_df)`` for a patient query, cached.
+
+    ``doctors_df`` is shared between callers, so treat it as read-only.
+    With ``limit`` it holds only the best ``limit`` doctors, and
+    ``doctors_df.attrs["matches"]`` counts every match.
+    """
+    query = normalize_query(disease, location, min_experience, min_rating)
+    log_query("recommend", disease=query[0], location=query[1], min_experience=query[2], min_rating=query[3])
+    # Keyed on the snapshot version too, so a query racing a reload can
+    # never store old results under the new data
+    key = (get_snapshot().version, get_weights(), limit) + query
+    result = result_cache.get(key)
+    if result is None:
+        disease, location, min_experience, min_rating = query
+        with query_scope():
+            specialist = predict_specialist(disease)
+            doctors_df = None
+            if specialist:
+                doctors_df = get_doctors_by_specialist(
+                    specialist,
+                    location=location,
+                    min_experience=min_experience,
+                    min_rating=min_rating,
+                    ranked=True,
+                    k=limit,
+                )
+        result = (specialist, doctors_df)
+        result_cache.put(key, result)
+    return result
+
+
+def split_conditions(text):
+    """Split free text listing several conditions into normalized names."""
+    conditions = (c.strip().lower() for c in CONDITION_SEPARATORS.split(text))
+    return list(dict.fromkeys(c for c in conditions if c))
+
+
+def recommend_for_conditions(conditions, location=None, min_experience=0, min_rating=None):
+    """Resolve several conditions at once and fetch doctors for all of them.
+
+    ``conditions`` is a list of names or free text (see split_conditions).
+    Returns a dict with:
+        specialists: {specialist: [conditions it covers]}
+        unknown:     conditions not in the disease map
+        sections:    {specialist: ranked doctors_df}
+        doctors:     all doctors merged, de-duplicated and ranked
+    Cached like recommend_doctors; treat the frames as read-only.
+    """
+    if isinstance(conditions, str):
+        conditions = split_conditions(conditions)
+    conditions = tuple(sorted({c.strip().lower() for c in conditions if c.strip()}))
+    _, location, min_experience, min_rating = normalize_query("", location, min_experience, min_rating)
+    log_query("conditions", conditions=list(conditions), location=location,
+              min_experience=min_experience, min_rating=min_rating)
+
+    snapshot = get_snapshot()
+    key = (snapshot.version, get_weights(), "multi", conditions, location, min_experience, min_rating)
+    result = result_cache.get(key)
+    if result is not None:
+        return result
+
+    # Resolve the whole set against the disease index in one pass
+    resolved = pd.Series(conditions, dtype=object).map(snapshot.specialist_by_disease)
+    specialists = {}
+    for condition, specialist in zip(conditions, resolved):
+        if isinstance(specialist, str):
+            specialists.setdefault(specialist, []).append(condition)
+    unknown = [c for c, s in zip(conditions, resolved) if not isinstance(s, str)]
+
+    # One grouped filter over the directory for every specialist
+    with query_scope():
+        by_key = get_doctors_by_specialists(specialists, location, min_experience, min_rating)
+    sections = {specialist: by_key[specialist.strip().lower()] for specialist in specialists}
+
+    frames = [df for df in sections.values() if not df.empty]
+    if frames:
+        merged = pd.concat(frames)
+        doctors = rank_frame(merged[~merged.index.duplicated()])
+    else:
+        doctors = snapshot.doctor_df.iloc[:0]
+
+    result = {"specialists": specialists, "unknown": unknown, "sections": sections, "doctors": doctors}
+    result_cache.put(key, result)
+    return result
+
+
+def cache_stats():
+    return result_cache.stats()
+
+
+# Cached results belong to the snapshot they were computed from
+add_reload_listener(lambda old_snapshot, new_snapshot: result_cache.clear())
@@ -0,0 +1,302 @@
+"""Doctor directory split across local worker processes (DOCWISE_DOCTOR_BACKEND=sharded)."""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules import columnar_store, ranking
+from modules.data_store import DATA_DIR, add_reload_listener, get_snapshot
+from modules.metrics import LatencyStats
+
+SHARD_COUNT = int(os.environ.get("DOCWISE_SHARDS", str(os.cpu_count() or 1)))
+# Partition key: "location" or "specialist" (CRC32 of the normalized value)
+SHARD_BY = os.environ.get("DOCWISE_SHARD_BY", "location")
+SHARD_DIR = os.environ.get("DOCWISE_SHARD_DIR", os.path.join(DATA_DIR, "doctor_profiles.shards"))
+
+ROW_ID = "RowId"
+PARTITION_COLUMNS = {"location": "Location", "specialist": "Specialist"}
+
+logger = logging.getLogger(__name__)
+
+
+class ShardError(RuntimeError):
+    """A request failed inside a shard process."""
+
+
+def shard_of(key, shards):
+    """Shard number of a normalized key; the same in every process."""
+    return zlib.crc32(key.encode()) % shards
+
+
+def partition(doctor_df, shards, by=SHARD_BY):
+    """Shard number for every row of ``doctor_df``."""
+    keys = doctor_df[PARTITION_COLUMNS[by]].astype(str).str.strip().str.lower()
+    # Hash each distinct key once, then spread by code
+    codes, uniques = pd.factorize(keys)
+    return np.array([shard_of(key, shards) for key in uniques], dtype=np.int64)[codes]
+
+
+def write_shards(doctor_df, shards, out_dir, by=SHARD_BY):
+    """Write one columnar directory per shard under ``out_dir``; returns their paths."""
+    assignment = partition(doctor_df, shards, by)
+    frame = doctor_df.assign(**{ROW_ID: np.arange(len(doctor_df), dtype=np.int64)})
+    paths = []
+    for shard in range(shards):
+        path = os.path.join(out_dir, f"shard-{shard:03d}")
+        columnar_store.write_columnar(frame[assignment == shard].reset_index(drop=True), path)
+        paths.append(path)
+    return paths
+
+
+# ---- Worker side ----
+
+def _load_shard(path, disease_df, version):
+    from modules.data_store import make_snapshot
+
+    doctor_df = columnar_store.load_columnar(path)
+    doctor_df.index = pd.Index(doctor_df.pop(ROW_ID).to_numpy(), name=None)
+    return make_snapshot(doctor_df, disease_df.copy(), version)
+
+
+def _shard_main(conn):
+    # Each shard process answers one query at a time against its own snapshot
+    from modules.data_store import repository
+    from modules.doctor_filtering import filter_snapshot
+
+    snapshot = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        op = message[0]
+        if op == "stop":
+            return
+        try:
+            if op == "load":
+                _, path, disease_df, version = message
+                snapshot = _load_shard(path, disease_df, version)
+                # Makes the ranking index follow this shard's data
+                repository.replace_snapshot(snapshot)
+                reply = ("ok", len(snapshot.doctor_df))
+            elif op == "query":
+                _, specialist, location, min_experience, min_rating, ranked, k, weights = message
+                if ranked and weights != ranking.get_weights():
+                    ranking.set_weights(**dict(weights))
+                started = time.perf_counter()
+                result = filter_snapshot(snapshot, specialist, location, min_experience, min_rating, ranked)
+                matches = len(result)
+                if k is not None:
+                    result = result.head(k)
+                reply = ("ok", result, matches, time.perf_counter() - started)
+            else:
+                reply = ("error", f"unknown op {op!r}")
+        except Exception as e:
+            # One bad request must not take the shard down
+            reply = ("error", repr(e))
+        conn.send(reply)
+
+
+# ---- Parent side ----
+
+class _Shard:
+    def __init__(self, number, context):
+        self.number = number
+        self.context = context
+        self.lock = threading.Lock()
+        self.rows = 0
+        self.restarts = 0
+        # The last successful load, replayed into a restarted process
+        self._loaded = None
+        self.round_trip = LatencyStats()
+        self.compute = LatencyStats()
+        self._start()
+
+    def _start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_shard_main, args=(child_conn,), name=f"docwise-shard-{self.number}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def _restart(self):
+        logger.warning("Shard %d process died (exit code %s), restarting it", self.number, self.process.exitcode)
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self._start()
+        self.restarts += 1
+        if self._loaded is not None:
+            self._check(self._send(self._loaded))
+
+    def _send(self, message):
+        self.conn.send(message)
+        return self.conn.recv()
+
+    def _check(self, reply):
+        if reply[0] == "error":
+            raise ShardError(f"shard {self.number}: {reply[1]}")
+        return reply
+
+    def call(self, message):
+        with self.lock:
+            if not self.process.is_alive():
+                self._restart()
+            try:
+                reply = self._send(message)
+            except (EOFError, OSError):
+                # Died while answering (crash, OOM kill): one retry on a fresh process
+                self._restart()
+                reply = self._send(message)
+            self._check(reply)
+            if message[0] == "load":
+                self._loaded = message
+            return reply
+
+    def query(self, *params):
+        started = time.perf_counter()
+        _, result, matches, compute_seconds = self.call(("query",) + params + (ranking.get_weights(),))
+        self.round_trip.record(time.perf_counter() - started)
+        self.compute.record(compute_seconds)
+        return result, matches
+
+
+class ShardedDirectory:
+    def __init__(self, shards=SHARD_COUNT, by=SHARD_BY, out_dir=SHARD_DIR):
+        if by not in PARTITION_COLUMNS:
+            raise ValueError(f"Unknown partition key {by!r}, expected one of {list(PARTITION_COLUMNS)}")
+        self.by = by
+        self.out_dir = out_dir
+        self.queries = 0
+        self.shards_touched = 0
+        self._version_dir = None
+        # spawn, not fork: a worker must not inherit the parent's full directory
+        context = multiprocessing.get_context("spawn")
+        self._shards = [_Shard(i, context) for i in range(shards)]
+        self._executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="docwise-scatter")
+        self.load(get_snapshot())
+
+    def load(self, snapshot):
+        """Partition ``snapshot`` and switch every shard over to it."""
+        version_dir = os.path.join(self.out_dir, f"v{snapshot.version}-{os.getpid()}")
+        paths = write_shards(snapshot.doctor_df, len(self._shards), version_dir, self.by)
+        for shard, path in zip(self._shards, paths):
+            _, shard.rows = shard.call(("load", path, snapshot.disease_df, snapshot.version))
+
+        old_dir, self._version_dir = self._version_dir, version_dir
+        if old_dir is not None:
+            # Workers no longer map these files (unlinking mapped files is safe anyway)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def shards_for(self, specialist, location=None):
+        key = ((specialist if self.by == "specialist" else location) or "").strip().lower()
+        # A blank location means "anywhere", as in filter_snapshot
+        if key:
+            return [self._shards[shard_of(key, len(self._shards))]]
+        return self._shards
+
+    def query(self, specialist, location=None, min_experience=0, min_rating=None, ranked=False, k=None):
+        """Matching doctors from every relevant shard, merged; the best ``k`` if given.
+
+        ``attrs["matches"]`` of the result counts every match, not just the ``k``.
+        """
+        targets = self.shards_for(specialist, location)
+        params = (specialist, location, min_experience, min_rating, ranked, k)
+        if len(targets) == 1:
+            replies = [targets[0].query(*params)]
+        else:
+            replies = list(self._executor.map(lambda shard: shard.query(*params), targets))
+        self.queries += 1
+        self.shards_touched += len(targets)
+        parts = [part for part, _ in replies]
+
+        parts = [part for part in parts if len(part)] or parts[:1]
+        merged = pd.concat(parts) if len(parts) > 1 else parts[0]
+        if len(parts) > 1:
+            # Same order each shard used, now across shards; stable sorts
+            # over global row order break ties like the in-memory backend
+            merged = merged.sort_index(kind="stable")
+            if ranked:
+                merged = ranking.rank_frame(merged)
+            elif min_rating is not None:
+                merged = merged.sort_values(by=["Rating", "Experience"], ascending=[False, False], kind="stable")
+            else:
+                merged = merged.sort_values(by="Experience", ascending=False, kind="stable")
+        merged = merged if k is None else merged.head(k)
+        merged.attrs["matches"] = sum(matches for _, matches in replies)
+        return merged
+
+    def stats(self):
+        return {
+            "shards": len(self._shards),
+            "partition_by": self.by,
+            "queries": self.queries,
+            "mean_fanout": self.shards_touched / self.queries if self.queries else 0.0,
+            "per_shard": [
+                {
+                    "shard": shard.number,
+                    "rows": shard.rows,
+                    "restarts": shard.restarts,
+                    "round_trip_seconds": shard.round_trip.summary(),
+                    "compute_seconds": shard.compute.summary(),
+                }
+                for shard in self._shards
+            ],
+        }
+
+    def close(self):
+        for shard in self._shards:
+            try:
+                with shard.lock:
+                    shard.conn.send(("stop",))
+            except OSError:
+                pass
+            shard.process.join(timeout=5)
+        self._executor.shutdown(wait=False)
+        if self._version_dir is not None:
+            shutil.rmtree(self._version_dir, ignore_errors=True)
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_directory():
+    """The process-wide sharded directory, started on first use."""
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            _directory = ShardedDirectory()
+    return _directory
+
+
+def _on_reload(old_snapshot, new_snapshot):
+    directory = _directory
+    if directory is not None:
+        directory.load(new_snapshot)
+
+
+def _forget_directory():
+    # A forked child shares the parent's shard pipes and has none of its
+    # scatter threads, so it starts shards of its own on first use
+    global _directory, _directory_lock
+    _directory = None
+    _directory_lock = threading.Lock()
+
+
+add_reload_listener(_on_reload)
+os.register_at_fork(after_in_child=_forget_directory)
+
+
+def get_doctors_by_specialist(specialist, location=None, min_experience=0, min_rating=None, ranked=False, k=None):
+    return get_directory().query(specialist, location, min_experience, min_rating, ranked, k)
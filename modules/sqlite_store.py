@@ -0,0 +1,219 @@
+"""
+Optional SQLite backend for the doctor directory.
+
+Keeps the directory on disk instead of in every worker's RAM: with
+DOCWISE_DOCTOR_BACKEND=sqlite the data snapshot skips the doctor rows,
+and the database is built straight from the doctor file. Filtering and
+ordering happen in SQL against composite indexes, and each thread reuses
+its own read-only connection. Callers get the same DataFrame shape as
+the in-memory backend.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from modules.data_store import DATA_DIR, add_reload_listener, get_snapshot, load_doctor_df
+
+DB_PATH = os.environ.get(
+    "DOCWISE_SQLITE_PATH", os.path.join(DATA_DIR, "doctor_directory.sqlite3")
+)
+
+SCHEMA = """
+CREATE TABLE doctors (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    specialist TEXT NOT NULL,
+    location TEXT NOT NULL,
+    location_key TEXT NOT NULL,
+    experience INTEGER NOT NULL,
+    contact INTEGER NOT NULL,
+    rating REAL,
+    specialist_label TEXT NOT NULL
+);
+CREATE INDEX idx_doctors_search
+    ON doctors (specialist, location_key, rating DESC, experience DESC);
+CREATE INDEX idx_doctors_specialist
+    ON doctors (specialist, rating DESC, experience DESC);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+# Part of the source signature, so a schema change rebuilds existing files
+SCHEMA_VERSION = 2
+
+COLUMNS = "id, name, specialist, location, experience, contact, rating"
+RESULT_COLUMNS = ["Name", "Specialist", "Location", "Experience", "Contact", "Rating"]
+RESULT_DTYPES = {"Experience": "int64", "Contact": "int64", "Rating": "float64"}
+
+_local = threading.local()
+_build_lock = threading.Lock()
+# Bumped on every reload, so threads reopen whichever file is current
+_generation = 0
+
+
+def _source_signature(file_mtimes):
+    return json.dumps([SCHEMA_VERSION, sorted(file_mtimes.items())])
+
+
+def build_database(file_mtimes, db_path=DB_PATH):
+    """Write the doctor file to a fresh SQLite file and swap it in.
+
+    ``file_mtimes`` is the data snapshot's, recorded so every process
+    can tell whether the file matches its own snapshot.
+    """
+    doctor_df = load_doctor_df()
+    rows = zip(
+        range(len(doctor_df)),
+        doctor_df["Name"].astype(str),
+        doctor_df["Specialist"].astype(str).str.strip().str.lower(),
+        doctor_df["Location"].astype(str),
+        doctor_df["Location"].astype(str).str.strip().str.lower(),
+        doctor_df["Experience"].astype(int),
+        doctor_df["Contact"].astype("int64"),
+        doctor_df["Rating"].astype(float),
+        doctor_df["Specialist"].astype(str).str.strip(),
+    )
+
+    tmp_path = f"{db_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO doctors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            "INSERT INTO meta VALUES ('source', ?)", (_source_signature(file_mtimes),)
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    # Readers still holding the old file keep querying it until they reconnect
+    os.replace(tmp_path, db_path)
+
+
+def _is_current(file_mtimes, db_path=DB_PATH):
+    if not os.path.exists(db_path):
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        return False
+    return row is not None and row[0] == _source_signature(file_mtimes)
+
+
+def ensure_database():
+    """Build the database from the live snapshot unless it is already current."""
+    global _generation
+    file_mtimes = get_snapshot().file_mtimes
+    with _build_lock:
+        if not _is_current(file_mtimes):
+            build_database(file_mtimes)
+            _generation += 1
+
+
+def start_build():
+    """Build the database in the background, so no query has to start it."""
+    thread = threading.Thread(target=ensure_database, name="docwise-sqlite-build", daemon=True)
+    thread.start()
+    return thread
+
+
+def _on_reload(old_snapshot, new_snapshot):
+    global _generation
+    with _build_lock:
+        # A reload can leave the doctor file untouched, or another process already rebuilt it
+        if not _is_current(new_snapshot.file_mtimes):
+            build_database(new_snapshot.file_mtimes)
+        # Either way the file may have been replaced under our connections
+        _generation += 1
+
+
+def _connection():
+    # One read-only connection per thread, reopened after a rebuild
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        if conn is not None:
+            conn.close()
+        ensure_database()
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+        _local.conn = conn
+        _local.generation = _generation
+    return conn
+
+
+def _to_dataframe(rows):
+    df = pd.DataFrame.from_records(rows, columns=["id"] + RESULT_COLUMNS)
+    return df.set_index("id").rename_axis(None).astype(RESULT_DTYPES)
+
+
+def get_doctors_by_specialist(specialist, location=None, min_experience=0, min_rating=None):
+    where = ["specialist = ?", "experience >= ?"]
+    params = [specialist.strip().lower(), min_experience]
+
+    if location:
+        where.append("location_key = ?")
+        params.append(location.strip().lower())
+
+    if min_rating is not None:
+        where.append("rating >= ?")
+        params.append(min_rating)
+        order_by = "rating DESC, experience DESC, id"
+    else:
+        order_by = "experience DESC, id"
+
+    sql = f"SELECT {COLUMNS} FROM doctors WHERE {' AND '.join(where)} ORDER BY {order_by}"
+    return _to_dataframe(_connection().execute(sql, params).fetchall())
+
+
+def specialist_counts():
+    """{specialist: number of doctors}"""
+    return dict(_connection().execute("SELECT specialist, COUNT(*) FROM doctors GROUP BY specialist"))
+
+
+def location_counts():
+    """(location as written, number of doctors) pairs, most doctors first"""
+    return _connection().execute(
+        "SELECT TRIM(location) AS place, COUNT(*) AS doctors FROM doctors "
+        "GROUP BY place ORDER BY doctors DESC, place"
+    ).fetchall()
+
+
+def qualified_counts(min_experience, min_rating):
+    """(specialist, location_key, doctors meeting both thresholds) for every pair in the directory"""
+    return _connection().execute(
+        "SELECT specialist, location_key, COUNT(CASE WHEN experience >= ? AND rating >= ? THEN 1 END) "
+        "FROM doctors GROUP BY specialist, location_key",
+        (min_experience, min_rating),
+    ).fetchall()
+
+
+def display_labels():
+    """({specialist: label}, {location_key: label}), each its first spelling in the doctor file"""
+    conn = _connection()
+    # With MIN(id), SQLite takes the bare columns from the first row of each group
+    specialists = conn.execute("SELECT specialist, specialist_label, MIN(id) FROM doctors GROUP BY specialist")
+    locations = conn.execute("SELECT location_key, TRIM(location), MIN(id) FROM doctors GROUP BY location_key")
+    return ({key: label for key, label, _ in specialists}, {key: label for key, label, _ in locations})
+
+
+def get_doctors(min_experience=0, min_rating=None):
+    """Every doctor meeting the thresholds, in directory order."""
+    sql, params = f"SELECT {COLUMNS} FROM doctors WHERE experience >= ?", [min_experience]
+    if min_rating is not None:
+        sql += " AND rating >= ?"
+        params.append(min_rating)
+    return _to_dataframe(_connection().execute(sql + " ORDER BY id", params).fetchall())
+
+
+def get_all_doctors():
+    rows = _connection().execute(f"SELECT {COLUMNS} FROM doctors ORDER BY id").fetchall()
+    return _to_dataframe(rows).to_dict(orient="records")
+
+
+add_reload_listener(_on_reload)
@@ -0,0 +1,469 @@
+import contextlib
+import logging
+import os
+import re
+import threading
+import time
+from itertools import product
+
+# For PDF summarization
+import torch
+from transformers import (
+    BartConfig, BartForConditionalGeneration, BartTokenizer, GenerationConfig,
+    StoppingCriteria, StoppingCriteriaList,
+)
+import PyPDF2
+
+from modules import admission, latency_scheduler
+
+MODEL_NAME = "facebook/bart-large-cnn"
+
+# Weights exported by export_shared_weights(). When present, every worker
+# memory-maps this one file read-only, so the ~1.6 GB of weights live once
+# in the page cache instead of once per process.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_WEIGHTS_PATH = os.environ.get(
+    "DOCWISE_SHARED_WEIGHTS", os.path.join(BASE_DIR, "models", "bart-large-cnn.pt")
+)
+
+# When set, this process doesn't load the model: summaries are generated by
+# the inference daemon (modules/inference_server.py) listening on this socket
+INFERENCE_SOCKET = os.environ.get("DOCWISE_INFERENCE_SOCKET", "")
+
+# Opt-in: load and prime the model on a background thread at startup
+WARMUP_ENABLED = os.environ.get("DOCWISE_WARMUP", "0") == "1"
+
+# Model lifecycle, as shown to users while the model is not ready yet
+MODEL_NOT_LOADED = "not loaded"
+MODEL_LOADING = "loading"
+MODEL_WARMING_UP = "warming up"
+MODEL_READY = "ready"
+MODEL_FAILED = "failed"
+
+# Generation settings. The defaults were chosen for speed; re-evaluate them
+# with benchmarks/summarizer_sweep.py. Override with DOCWISE_SUMMARY_SETTINGS
+# ("num_beams=4,length_penalty=2.0,input_strategy=head_tail") or set_settings().
+DEFAULT_SETTINGS = {
+    "num_beams": 2,
+    "length_penalty": 1.5,
+    "no_repeat_ngram_size": 3,
+    "max_input_tokens": 1024,
+    "input_strategy": "head",
+}
+
+# How a report longer than max_input_tokens is cut down:
+#   head       keep the beginning (plain truncation)
+#   head_tail  keep the beginning and the last quarter (conclusions, plans)
+#   dedupe     drop repeated sentences (templated boilerplate), then head
+INPUT_STRATEGIES = ("head", "head_tail", "dedupe")
+
+WARMUP_TEXT = (
+    "The patient was admitted with chest pain and shortness of breath. "
+    "ECG and troponin levels were normal. Discharged with follow-up advice."
+)
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+_model_state = MODEL_NOT_LOADED
+_model_error = None
+_warmup_thread = None
+# Separate from _model_lock, which is held for the whole load
+_warmup_lock = threading.Lock()
+
+
+def parse_settings(spec):
+    """Parse "num_beams=4,input_strategy=dedupe" into a full settings dict."""
+    settings = dict(DEFAULT_SETTINGS)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        settings.update(_checked_settings({name.strip(): value.strip()}))
+    return settings
+
+
+def _checked_settings(overrides):
+    checked = {}
+    for name, value in overrides.items():
+        if name not in DEFAULT_SETTINGS:
+            raise ValueError(f"Unknown summary setting {name!r}")
+        value = type(DEFAULT_SETTINGS[name])(value)
+        if name == "input_strategy" and value not in INPUT_STRATEGIES:
+            raise ValueError(f"Unknown input strategy {value!r}, expected one of {INPUT_STRATEGIES}")
+        checked[name] = value
+    return checked
+
+
+_settings = parse_settings(os.environ.get("DOCWISE_SUMMARY_SETTINGS", ""))
+
+
+def get_settings():
+    return dict(_settings)
+
+
+def set_settings(**settings):
+    """Change the default generation settings for this process."""
+    global _settings
+    _settings = {**_settings, **_checked_settings(settings)}
+
+
+def export_shared_weights(path=SHARED_WEIGHTS_PATH):
+    """Save the model's weights in a file that can be loaded with mmap."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    model = BartForConditionalGeneration.from_pretrained(MODEL_NAME)
+    tmp_path = path + ".tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _load_mapped_model(path):
+    # Build the module skeleton without allocating weights, then point its
+    # parameters straight at the memory-mapped tensors (no copy)
+    config = BartConfig.from_pretrained(MODEL_NAME)
+    with torch.device("meta"):
+        model = BartForConditionalGeneration(config)
+
+    state_dict = torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+    model.load_state_dict(state_dict, assign=True)
+    model.tie_weights()
+
+    missing = [name for name, tensor in model.state_dict().items() if tensor.is_meta]
+    if missing:
+        raise RuntimeError(f"Shared weights file is missing tensors: {missing[:5]}")
+
+    model.generation_config = GenerationConfig.from_pretrained(MODEL_NAME)
+    return model.eval()
+
+
+def load_bart_model():
+    """Load BART model for PDF summarization (once per process)
+
+    Returns ``(None, None)`` when summaries come from the inference
+    daemon; summarize() then sends the text there.
+    """
+    global _model_state
+    if INFERENCE_SOCKET:
+        if _warmup_thread is None:
+            _model_state = MODEL_READY
+        return None, None
+    return load_local_model()
+
+
+def load_local_model():
+    """Load the model into this process, whatever INFERENCE_SOCKET says"""
+    global _model, _model_state, _model_error
+    with _model_lock:
+        if _model is None:
+            _model_state = MODEL_LOADING
+            try:
+                tokenizer = BartTokenizer.from_pretrained(MODEL_NAME)
+                if os.path.exists(SHARED_WEIGHTS_PATH):
+                    model = _load_mapped_model(SHARED_WEIGHTS_PATH)
+                else:
+                    logger.info("No shared weights at %s, loading a private copy", SHARED_WEIGHTS_PATH)
+                    model = BartForConditionalGeneration.from_pretrained(MODEL_NAME)
+            except Exception as e:
+                _model_error = str(e)
+                _model_state = MODEL_FAILED
+                raise
+            _model = (tokenizer, model)
+            _model_error = None
+            if _warmup_thread is None:
+                # Loaded on demand, nobody is going to warm it up
+                _model_state = MODEL_READY
+    return _model
+
+
+def _warm_up():
+    global _model_state, _model_error
+    try:
+        started = time.perf_counter()
+        tokenizer, model = load_bart_model()
+        _model_state = MODEL_WARMING_UP
+        # One short generation with the real settings primes kernels and allocators
+        summarize(WARMUP_TEXT, tokenizer, model, max_length=30, min_length=5)
+        _model_state = MODEL_READY
+        logger.info("Model warm-up finished in %.1fs", time.perf_counter() - started)
+    except Exception as e:
+        _model_error = str(e)
+        _model_state = MODEL_FAILED
+        logger.exception("Model warm-up failed")
+        return
+    if model is not None:
+        # After READY, so requests are served meanwhile; the daemon calibrates itself
+        try:
+            calibrate_latency(tokenizer, model)
+        except Exception:
+            logger.exception("Latency calibration failed; planning with the default cost model")
+
+
+def start_warmup():
+    """Start loading and priming the model in the background (idempotent)."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warm_up, name="docwise-model-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def model_state():
+    """Return ``(state, error)``; state is one of the MODEL_* constants."""
+    return _model_state, _model_error
+
+
+def is_model_ready():
+    return _model_state == MODEL_READY
+
+
+def extract_text_from_pdf(uploaded_file):
+    """Extract text from PDF file"""
+    pdf_reader = PyPDF2.PdfReader(uploaded_file)
+    extracted_text = ""
+    for page in pdf_reader.pages:
+        extracted_text += page.extract_text()
+    return extracted_text
+
+
+def count_pdf_pages(pdf_file):
+    """Number of pages, leaving the file positioned at the start"""
+    pages = len(PyPDF2.PdfReader(pdf_file).pages)
+    pdf_file.seek(0)
+    return pages
+
+
+def estimate_tokens(text):
+    """BART input tokens for ``text`` before truncation: ~4 per 3 words, plus special tokens."""
+    return len(text.split()) * 4 // 3 + 4
+
+
+def generates_remotely(model):
+    """True when the inference daemon, not this process, runs generate()."""
+    return model is None and bool(INFERENCE_SOCKET)
+
+
+def generation_cost_mb(model, input_tokens, num_beams):
+    """Memory this process needs to generate: none when the daemon does it."""
+    if generates_remotely(model):
+        return 0.0
+    return admission.estimate_cost_mb(0, input_tokens, num_beams)
+
+
+def measure_generation(model):
+    """admission.measure_stage("generate"), unless the daemon generates (and measures) it."""
+    if generates_remotely(model):
+        return contextlib.nullcontext()
+    return admission.measure_stage("generate")
+
+
+def summarize_pdf(pdf_file, tokenizer, model, max_length=200, min_length=50, settings=None,
+                  budget=None, timeout=None, cancel_token=None, on_text=None, latency_budget=None):
+    """Extract and summarize a PDF within the memory budget; returns (text, summary).
+
+    ``on_text(text)`` is called as soon as the text is extracted, before
+    generation starts (e.g. to show an extractive summary meanwhile).
+    ``latency_budget`` (seconds) counts from the call: generation gets
+    what is left after waiting for memory and extracting the text.
+
+    Raises admission.AdmissionRejected instead of starting work that
+    would push the process past its budget.
+    """
+    started = time.perf_counter()
+    budget = budget or admission.budget
+    settings = {**_settings, **_checked_settings(settings or {})}
+    max_tokens, beams = settings["max_input_tokens"], settings["num_beams"]
+
+    pages = count_pdf_pages(pdf_file)
+    cost = pages * admission.PAGE_COST_MB + generation_cost_mb(
+        model, min(pages * admission.TOKENS_PER_PAGE, max_tokens), beams
+    )
+    with budget.reserve(cost, timeout, cancel_token) as reservation:
+        with admission.measure_stage("extract"):
+            text = extract_text_from_pdf(pdf_file)
+        if on_text is not None:
+            on_text(text)
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        # The parsed PDF is garbage from here on
+        tokens = min(estimate_tokens(text), max_tokens)
+        reservation.shrink(generation_cost_mb(model, tokens, beams))
+        if latency_budget is not None:
+            latency_budget = max(latency_budget - (time.perf_counter() - started), 0.0)
+        summary = _generate(text, tokenizer, model, max_length, min_length, settings, cancel_token, latency_budget)
+    return text, summary
+
+
+def summarize_text(text, tokenizer, model, max_length=200, min_length=50, settings=None,
+                   budget=None, timeout=None, cancel_token=None, latency_budget=None, budget_start=None):
+    """Summarize already extracted text within the memory budget.
+
+    The generation half of summarize_pdf(), for callers that extract the
+    text themselves first (e.g. to show an extractive summary before
+    waiting for memory or a generation thread). ``latency_budget``
+    counts from ``budget_start`` (a time.perf_counter() value; default:
+    the call), so the time spent before generation is deducted.
+    """
+    budget_start = time.perf_counter() if budget_start is None else budget_start
+    budget = budget or admission.budget
+    settings = {**_settings, **_checked_settings(settings or {})}
+    tokens = min(estimate_tokens(text), settings["max_input_tokens"])
+    cost = generation_cost_mb(model, tokens, settings["num_beams"])
+    with contextlib.nullcontext() if generates_remotely(model) else budget.reserve(cost, timeout, cancel_token):
+        if latency_budget is not None:
+            latency_budget = max(latency_budget - (time.perf_counter() - budget_start), 0.0)
+        return _generate(text, tokenizer, model, max_length, min_length, settings, cancel_token, latency_budget)
+
+
+def _generate(text, tokenizer, model, max_length, min_length, settings, cancel_token, latency_budget):
+    with measure_generation(model):
+        if latency_budget is None:
+            return summarize(text, tokenizer, model, max_length, min_length, settings, cancel_token)
+        return summarize_within_budget(text, tokenizer, model, latency_budget, max_length, min_length,
+                                       settings, cancel_token)[0]
+
+
+def _dedupe_sentences(text):
+    seen = set()
+    kept = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        key = " ".join(sentence.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            kept.append(sentence)
+    return " ".join(kept)
+
+
+def encode_input(text, tokenizer, strategy="head", max_input_tokens=1024):
+    """Token ids (1 x n tensor) of the part of ``text`` the model will read."""
+    if strategy == "dedupe":
+        text = _dedupe_sentences(text)
+    if strategy != "head_tail":
+        return tokenizer.encode(
+            "summarize: " + text,
+            max_length=max_input_tokens,
+            truncation=True,
+            return_tensors="pt"
+        )
+
+    ids = tokenizer.encode("summarize: " + text)
+    if len(ids) > max_input_tokens:
+        tail = max_input_tokens // 4
+        head = max_input_tokens - tail
+        # ids end with </s>, which the tail slice keeps
+        ids = ids[:head] + ids[-tail:]
+    return torch.tensor([ids])
+
+
+class _CancelCriteria(StoppingCriteria):
+    """Checked by generate() after every decode step."""
+
+    def __init__(self, token):
+        self.token = token
+
+    def __call__(self, input_ids, scores, **kwargs):
+        # A plain bool: transformers < 4.39 takes any() over the criteria's results
+        return self.token.step()
+
+
+def summarize(text, tokenizer, model, max_length=200, min_length=50, settings=None, cancel_token=None):
+    """Generate summary using BART model - raises on failure
+
+    With a generation_control.CancelToken, generation stops within one
+    decode step of the token being cancelled and GenerationCancelled is
+    raised instead of returning a partial summary. Without a local
+    model (DOCWISE_INFERENCE_SOCKET) the inference daemon generates it.
+    """
+    settings = {**_settings, **_checked_settings(settings or {})}
+    if model is None and INFERENCE_SOCKET:
+        from modules.inference_client import get_client
+        return get_client(INFERENCE_SOCKET).summarize(text, max_length, min_length, settings, cancel_token)
+
+    inputs = encode_input(text, tokenizer, settings["input_strategy"], settings["max_input_tokens"])
+    extra = {}
+    if cancel_token is not None:
+        extra["stopping_criteria"] = StoppingCriteriaList([_CancelCriteria(cancel_token)])
+
+    started = time.perf_counter()
+    summary_ids = model.generate(
+        inputs,
+        max_length=max_length,
+        min_length=min_length,
+        num_beams=settings["num_beams"],
+        length_penalty=settings["length_penalty"],
+        early_stopping=True,
+        no_repeat_ngram_size=settings["no_repeat_ngram_size"],
+        **extra
+    )
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    # Every generation refines the cost model the latency scheduler plans with
+    latency_scheduler.observe(inputs.shape[1], settings["num_beams"], summary_ids.shape[1],
+                              time.perf_counter() - started)
+
+    return tokenizer.decode(
+        summary_ids[0],
+        skip_special_tokens=True
+    )
+
+
+def summarize_within_budget(text, tokenizer, model, latency_budget, max_length=200, min_length=50,
+                            settings=None, cancel_token=None):
+    """Summarize in about ``latency_budget`` seconds; returns (summary, plan).
+
+    latency_scheduler picks the beams, input window, chunking strategy
+    and maximum length predicted to fit on this host, capped by
+    ``settings`` and ``max_length``. The plan records the predicted and
+    actual time. Without a local model the inference daemon plans with
+    its own cost model, and the actual time here is end to end.
+    """
+    started = time.perf_counter()
+    settings = {**_settings, **_checked_settings(settings or {})}
+    if model is None and INFERENCE_SOCKET:
+        from modules.inference_client import get_client
+        summary, plan = get_client(INFERENCE_SOCKET).summarize_within_budget(
+            text, latency_budget, max_length, min_length, settings, cancel_token
+        )
+        plan["latency_budget"] = latency_budget
+        latency_scheduler.report(plan, time.perf_counter() - started)
+        return summary, plan
+
+    plan = latency_scheduler.plan(latency_budget, settings, estimate_tokens(text),
+                                  estimate_tokens(_dedupe_sentences(text)), max_length, min_length)
+    summary = summarize(text, tokenizer, model, plan["max_length"], plan["min_length"], plan["settings"],
+                        cancel_token)
+    latency_scheduler.report(plan, time.perf_counter() - started)
+    return summary, plan
+
+
+def calibrate_latency(tokenizer, model, input_lengths=(64, 512), beams=(1, 2), output_lengths=(4, 12)):
+    """Time a few small fixed-size generations and fit the latency cost model to them."""
+    ids = tokenizer.encode(WARMUP_TEXT * 100)
+    for input_tokens, num_beams, output_tokens in product(input_lengths, beams, output_lengths):
+        inputs = torch.tensor([ids[:input_tokens]])
+        started = time.perf_counter()
+        # min_length == max_length: exactly output_tokens decode steps
+        model.generate(inputs, max_length=output_tokens, min_length=output_tokens,
+                       num_beams=num_beams, early_stopping=True)
+        latency_scheduler.observe(input_tokens, num_beams, output_tokens, time.perf_counter() - started)
+    logger.info("Latency cost model: %s", latency_scheduler.scheduler.cost.summary())
+
+
+def generate_summary(text, tokenizer, model, max_length=200, min_length=50, settings=None, latency_budget=None):
+    """Generate summary using BART model - optimized for speed
+
+    With ``latency_budget`` (seconds) the settings are chosen to finish
+    within it (summarize_within_budget).
+    """
+    try:
+        if latency_budget is not None:
+            return summarize_within_budget(text, tokenizer, model, latency_budget, max_length, min_length,
+                                           settings)[0]
+        return summarize(text, tokenizer, model, max_length, min_length, settings)
+    except Exception as e:
+        return f"Error generating summary: {str(e)}"
+
+
+if __name__ == "__main__":
+    # python -m modules.summarizer  -> write the shared, mmap-able weights file
+    print(f"Wrote shared weights to {export_shared_weights()}")
@@ -0,0 +1,274 @@
+"""
+Job-based summarization: submit a PDF, get a job id back immediately,
+poll for the result.
+
+Jobs live in a local SQLite queue so they survive restarts. A running
+job holds a lease that its process renews every few seconds; a job whose
+lease has expired (its process died) is put back in the queue, while
+jobs that live sibling processes are running are left alone. Finished
+jobs are deleted after DOCWISE_JOBS_RETENTION seconds. A fixed
+pool of worker threads takes jobs in arrival order; once ``max_queued``
+jobs are waiting, new submissions are rejected with QueueFull instead
+of growing the backlog. Queue wait and service time are tracked
+separately, along with rejections, to size the pool.
+"""
+
+import io
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from modules.admission import AdmissionRejected
+from modules.data_store import DATA_DIR
+from modules.metrics import LatencyStats
+
+JOBS_DB_PATH = os.environ.get(
+    "DOCWISE_JOBS_DB_PATH", os.path.join(DATA_DIR, "summary_jobs.sqlite3")
+)
+
+# A running job's owner renews its lease every LEASE_SECONDS / 4
+LEASE_SECONDS = float(os.environ.get("DOCWISE_JOBS_LEASE_SECONDS", "60"))
+# Finished (done or failed) jobs are kept this long for polling
+RETENTION_SECONDS = float(os.environ.get("DOCWISE_JOBS_RETENTION", str(7 * 24 * 3600)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    max_length INTEGER NOT NULL,
+    min_length INTEGER NOT NULL,
+    pdf BLOB,
+    summary TEXT,
+    word_count INTEGER,
+    error TEXT,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, created_at);
+"""
+
+# Added after the first release; older databases get them on open
+LEASE_COLUMNS = {"owner": "TEXT", "lease_until": "REAL"}
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the backlog is at its limit."""
+
+
+class SummaryJobQueue:
+    def __init__(self, db_path=JOBS_DB_PATH, workers=1, max_queued=32):
+        self.db_path = db_path
+        self.max_queued = max_queued
+        self.queue_wait = LatencyStats()
+        self.service_time = LatencyStats()
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.recovered = 0
+        self.pruned = 0
+        # Unique per queue, so a restarted process with a reused pid is a new owner
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in LEASE_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        self._maintain()
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f"docwise-summary-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._maintainer = threading.Thread(target=self._maintain_loop, name="docwise-summary-lease", daemon=True)
+        self._maintainer.start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---- client side ----
+
+    def submit(self, pdf_bytes, max_length=200, min_length=50):
+        """Queue a PDF for summarization and return its job id."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(f"{queued} jobs already queued")
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, max_length, min_length, pdf) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, time.time(), max_length, min_length, pdf_bytes),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def status(self, job_id):
+        """Job state as a dict, or None for an unknown id."""
+        row = self._conn().execute(
+            "SELECT id, status, created_at, started_at, finished_at, summary, word_count, error "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        if job["status"] == "queued":
+            job["position"] = self._conn().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at <= ?",
+                (job["created_at"],)
+            ).fetchone()[0]
+        return job
+
+    def result(self, job_id):
+        """The summary text once the job is done, else None."""
+        job = self.status(job_id)
+        return job["summary"] if job and job["status"] == "done" else None
+
+    def stats(self):
+        counts = dict(self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "workers": len(self._threads),
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "recovered": self.recovered,
+            "pruned": self.pruned,
+            "queue_wait_seconds": self.queue_wait.summary(),
+            "service_seconds": self.service_time.summary(),
+        }
+
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    # ---- worker side ----
+
+    def _maintain(self):
+        """Renew our leases, requeue expired ones and delete old finished jobs."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE status = 'running' AND owner = ?",
+            (now + LEASE_SECONDS, self.owner),
+        )
+        # Owned by a process that stopped renewing: it died mid-job
+        recovered = conn.execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, lease_until = NULL "
+            "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)", (now,)
+        ).rowcount
+        if recovered:
+            logger.warning("Requeued %d summary jobs whose worker process is gone", recovered)
+            self.recovered += recovered
+            with self._wakeup:
+                self._wakeup.notify_all()
+        self.pruned += conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (now - RETENTION_SECONDS,)
+        ).rowcount
+
+    def _maintain_loop(self):
+        while not self._stopping:
+            time.sleep(LEASE_SECONDS / 4)
+            try:
+                self._maintain()
+            except sqlite3.Error:
+                logger.exception("Summary job lease renewal failed")
+
+    def _claim(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, created_at, max_length, min_length, pdf FROM jobs "
+                "WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, lease_until = ? WHERE id = ?",
+                    (now, self.owner, now + LEASE_SECONDS, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _work(self):
+        # Imported here so merely submitting or polling never loads torch
+        from modules.summarizer import load_bart_model, summarize_pdf
+
+        while not self._stopping:
+            job = self._claim()
+            if job is None:
+                # Also poll, so jobs submitted by other processes get picked up
+                with self._wakeup:
+                    self._wakeup.wait(timeout=1.0)
+                continue
+
+            started = time.time()
+            self.queue_wait.record(started - job["created_at"])
+            try:
+                tokenizer, model = load_bart_model()
+                # A queued job waits for memory rather than being dropped;
+                # only one that could never fit is rejected
+                text, summary = summarize_pdf(
+                    io.BytesIO(job["pdf"]), tokenizer, model, job["max_length"], job["min_length"],
+                    timeout=float("inf"),
+                )
+            except AdmissionRejected as e:
+                logger.warning("Summary job %s rejected: %s", job["id"], e)
+                self._finish(job["id"], "failed", error=f"rejected: {e}")
+                self.failed += 1
+            except Exception as e:
+                logger.exception("Summary job %s failed", job["id"])
+                self._finish(job["id"], "failed", error=str(e))
+                self.failed += 1
+            else:
+                self._finish(job["id"], "done", summary=summary, word_count=len(text.split()))
+                self.completed += 1
+            self.service_time.record(time.time() - started)
+
+    def _finish(self, job_id, status, summary=None, word_count=None, error=None):
+        # The PDF is no longer needed once the job has an outcome. If our
+        # lease lapsed and another process took the job over, leave it to them.
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, summary = ?, word_count = ?, "
+            "error = ?, pdf = NULL, lease_until = NULL WHERE id = ? AND owner = ?",
+            (status, time.time(), summary, word_count, error, job_id, self.owner),
+        )
@@ -0,0 +1,78 @@
+"""
+Synthetic doctor directories of any size, for load and capacity tests.
+
+Specialties cover everything the disease map can recommend and cities
+extend the real roster with other Indian cities; both follow a Zipf-like
+skew so a few specialties and metros dominate like in a real national
+directory. Names, experience and ratings are drawn from the same pools
+and distributions as data/doctor_profiles.csv. Contacts are unique.
+
+Usage: python -m modules.synthetic_directory 1000000 -o doctors_1m.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from modules.data_store import DISEASE_CSV_PATH, DOCTOR_CSV_PATH
+
+EXTRA_CITIES = [
+    "Mumbai", "Delhi", "Bengaluru", "Hyderabad", "Kolkata", "Pune", "Ahmedabad",
+    "Jaipur", "Lucknow", "Kochi", "Thiruvananthapuram", "Mysuru", "Visakhapatnam",
+    "Nagpur", "Indore", "Bhopal", "Patna", "Chandigarh", "Guwahati", "Bhubaneswar",
+]
+
+# Bigger cities first, so the Zipf weights favour them
+METROS = ["Chennai", "Mumbai", "Delhi", "Bengaluru", "Hyderabad", "Kolkata", "Pune"]
+
+
+def zipf_weights(count, exponent):
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_directory(rows, seed=0, specialty_skew=0.8, city_skew=1.1):
+    """Return a DataFrame shaped like doctor_profiles.csv with ``rows`` doctors."""
+    rng = np.random.default_rng(seed)
+    real = pd.read_csv(DOCTOR_CSV_PATH)
+    disease_map = pd.read_csv(DISEASE_CSV_PATH)
+
+    # Specialties ordered by how many diseases map to them
+    specialists = np.array(list(dict.fromkeys(
+        disease_map["Specialist"].str.strip().value_counts().index.tolist()
+        + real["Specialist"].str.strip().value_counts().index.tolist()
+    )))
+    cities = list(dict.fromkeys(METROS + real["Location"].value_counts().index.tolist() + EXTRA_CITIES))
+    cities = np.array(cities)
+
+    first_names = np.array(sorted({name.split()[1] for name in real["Name"]}))
+    last_names = np.array(sorted({name.split()[2] for name in real["Name"]}))
+    ratings = real["Rating"].value_counts(normalize=True)
+
+    names = pd.Series(first_names[rng.integers(0, len(first_names), rows)])
+    names = "Dr. " + names + " " + last_names[rng.integers(0, len(last_names), rows)]
+
+    return pd.DataFrame({
+        "Name": names,
+        "Specialist": specialists[rng.choice(len(specialists), rows, p=zipf_weights(len(specialists), specialty_skew))],
+        "Location": cities[rng.choice(len(cities), rows, p=zipf_weights(len(cities), city_skew))],
+        "Experience": rng.integers(real["Experience"].min(), real["Experience"].max() + 1, rows),
+        "Contact": 6000000000 + rng.permutation(rows),
+        "Rating": rng.choice(ratings.index.to_numpy(), rows, p=ratings.to_numpy()),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic doctor directory")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("-o", "--output", required=True, help="CSV path to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    generate_directory(args.rows, args.seed).to_csv(args.output, index=False)
+    print(f"Wrote {args.rows} doctors to {args.output}")
+
+
+if __name__ == "__main__":
+    main()